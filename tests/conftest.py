@@ -0,0 +1,28 @@
+import pytest
+
+
+@pytest.fixture
+def population_raster(tmp_path):
+    """
+    4x4 population GeoTIFF with 1 degree cells from 8E/50N, the cell values are 0 to 15 row by row.
+    The upper left cell is nodata.
+    """
+    numpy = pytest.importorskip("numpy")
+    rasterio = pytest.importorskip("rasterio")
+    from rasterio.transform import from_origin
+
+    path = str(tmp_path / "population.tif")
+    data = numpy.arange(16, dtype=numpy.float32).reshape(4, 4)
+    data[0, 0] = -200
+    with rasterio.open(path,
+                       "w",
+                       driver="GTiff",
+                       width=4,
+                       height=4,
+                       count=1,
+                       dtype="float32",
+                       crs="EPSG:4326",
+                       nodata=-200,
+                       transform=from_origin(8.0, 50.0, 1.0, 1.0)) as dataset:
+        dataset.write(data, 1)
+    return path
@@ -0,0 +1,82 @@
+import pytest
+
+pytest.importorskip("shapely")
+pytest.importorskip("geopandas")
+
+from unrelevant.shared.boundaries import boundary_geometry, merge_boundaries, simplify_geometry, split_by_boundaries, \
+    tile_geometry
+
+
+def square(x, y, size=1.0):
+    return {
+        "type":
+        "FeatureCollection",
+        "features": [{
+            "type": "Feature",
+            "properties": {},
+            "geometry": {
+                "type":
+                "Polygon",
+                "coordinates": [[[x, y], [x + size, y], [x + size, y + size],
+                                 [x, y + size], [x, y]]]
+            }
+        }]
+    }
+
+
+def point(x, y, osm_id):
+    return {
+        "type": "Feature",
+        "properties": {
+            "@osmId": osm_id
+        },
+        "geometry": {
+            "type": "Point",
+            "coordinates": [x, y]
+        }
+    }
+
+
+def test_merge_boundaries():
+    merged = merge_boundaries({"A": square(0, 0), "B": square(1, 0)})
+    assert [feature["id"] for feature in merged["features"]] == ["A_0", "B_0"]
+
+
+def test_split_by_boundaries():
+    boundaries = {
+        "A": boundary_geometry(square(0, 0)),
+        "B": boundary_geometry(square(1, 0))
+    }
+    points = {
+        "type":
+        "FeatureCollection",
+        "filterQuery":
+        "leisure=park",
+        "features": [
+            point(0.5, 0.5, "a"),
+            point(1.0, 0.5, "border"),
+            point(1.5, 0.5, "b"),
+            point(5, 5, "outside")
+        ]
+    }
+    split = split_by_boundaries(points, boundaries)
+    assert [f["properties"]["@osmId"]
+            for f in split["A"]["features"]] == ["a", "border"]
+    assert [f["properties"]["@osmId"]
+            for f in split["B"]["features"]] == ["border", "b"]
+    assert split["A"]["filterQuery"] == "leisure=park"
+
+
+def test_tile_geometry():
+    geometry = boundary_geometry(square(13.0, 52.0, size=0.5))
+    assert len(tile_geometry(geometry, max_area_km2=1e6)) == 1
+    tiles = tile_geometry(geometry, max_area_km2=200)
+    assert len(tiles) > 1
+    assert sum(tile.area for tile in tiles) == pytest.approx(geometry.area)
+
+
+def test_simplify_geometry_covers_original():
+    geometry = boundary_geometry(square(13.0, 52.0, size=0.5)).buffer(0.1)
+    simplified = simplify_geometry(geometry, tolerance_m=500, precision=3)
+    assert simplified.covers(geometry)
+    assert len(simplified.exterior.coords) < len(geometry.exterior.coords)
@@ -0,0 +1,63 @@
+import pickle
+
+import pytest
+
+from unrelevant.shared.cache import OhsomeResponseCache, SQLiteLRUCache, hash_key
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return SQLiteLRUCache(path=str(tmp_path / "cache.sqlite"),
+                          max_size_bytes=30)
+
+
+def test_hash_key():
+    assert hash_key("ors", [8.6, 49.4]) == hash_key("ors", [8.6, 49.4])
+    assert hash_key("ors", [8.6, 49.4]) != hash_key("ors", [49.4, 8.6])
+
+
+def test_hits_and_misses(cache):
+    assert cache.get("a") is None
+    cache.set("a", b"value")
+    assert cache.get("a") == b"value"
+    assert cache.hits == 1
+    assert cache.misses == 1
+    cache.reset_statistics()
+    assert cache.hits == 0
+
+
+def test_lru_eviction(cache):
+    cache.set("a", b"0123456789")
+    cache.set("b", b"0123456789")
+    cache.get("a")
+    cache.set("c", b"0123456789")
+    cache.set("d", b"0123456789")
+    assert "a" in cache
+    assert "b" not in cache
+    assert cache.size_bytes <= cache.max_size_bytes
+
+
+def test_oversized_entries_are_skipped(cache):
+    cache.set("a", b"x" * 31)
+    assert len(cache) == 0
+
+
+def test_pickle(cache):
+    cache.set("a", b"value")
+    restored = pickle.loads(pickle.dumps(cache))
+    assert restored.get("a") == b"value"
+
+
+def test_ohsome_cache_invalidated_by_snapshot(tmp_path):
+    path = str(tmp_path / "ohsome.sqlite")
+    cache = OhsomeResponseCache(path=path)
+    cache.set_snapshot("2021-10-01T00:00Z")
+    cache.set("elements/centroid", b"{}", filter="leisure=park")
+    assert cache.get("elements/centroid", filter="leisure=park") == b"{}"
+    assert cache.get("elements/centroid", filter="natural=beach") is None
+
+    cache = OhsomeResponseCache(path=path)
+    cache.set_snapshot("2021-10-01T00:00Z")
+    assert cache.get("elements/centroid", filter="leisure=park") == b"{}"
+    cache.set_snapshot("2021-11-01T00:00Z")
+    assert cache.get("elements/centroid", filter="leisure=park") is None
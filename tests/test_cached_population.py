@@ -0,0 +1,53 @@
+import pytest
+
+pytest.importorskip("shapely")
+
+from unrelevant.UnrelevantBase.Population.CachedPopulationFetcher import CachedPopulationFetcher
+
+
+class AreaFetcher(object):
+    batch_size = 10
+    source = "area"
+
+    def __init__(self):
+        self.requested = []
+
+    def get_population_data(self, wkt_geom: str):
+        self.requested.append(wkt_geom)
+        return 1.0
+
+    def get_population_data_many(self, wkt_geoms: {}) -> {}:
+        return {
+            key: self.get_population_data(wkt_geom)
+            for key, wkt_geom in wkt_geoms.items()
+        }
+
+
+SQUARE = "POLYGON((0 0, 1 0, 1 1, 0 1, 0 0))"
+OTHER = "POLYGON((0 0, 2 0, 2 2, 0 2, 0 0))"
+
+
+def test_memoized_in_memory():
+    fetcher = AreaFetcher()
+    cached = CachedPopulationFetcher(fetcher)
+    assert cached.get_population_data(SQUARE) == 1.0
+    assert cached.get_population_data_many({
+        "a": SQUARE,
+        "b": OTHER
+    }) == {
+        "a": 1.0,
+        "b": 1.0
+    }
+    assert fetcher.requested == [SQUARE, OTHER]
+    assert cached.hits == 1
+    assert cached.misses == 2
+
+
+def test_persisted(tmp_path):
+    path = str(tmp_path / "population.sqlite")
+    CachedPopulationFetcher(AreaFetcher(),
+                            cache_path=path).get_population_data(SQUARE)
+    fetcher = AreaFetcher()
+    assert CachedPopulationFetcher(
+        fetcher, cache_path=path).get_population_data(SQUARE) == 1.0
+    assert fetcher.requested == []
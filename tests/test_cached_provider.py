@@ -0,0 +1,60 @@
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from unrelevant.UnrelevantBase.Provider.CachedProvider import CachedProvider
+from unrelevant.UnrelevantBase.Provider.SyntheticProvider import SyntheticProvider
+
+
+class CountingProvider(SyntheticProvider):
+    def __init__(self):
+        super().__init__(profile="bicycle", vertices=8)
+        self.requested_ranges = []
+
+    def isochrones(self, coordinates: [], iso_range, range_type: str):
+        self.requested_ranges.append(list(iso_range))
+        return super().isochrones(coordinates, iso_range, range_type)
+
+
+@pytest.fixture
+def provider():
+    return CountingProvider()
+
+
+@pytest.fixture
+def cached_provider(provider, tmp_path):
+    return CachedProvider(provider, cache_path=str(tmp_path / "cache.sqlite"))
+
+
+def test_cached_response(cached_provider, provider):
+    first = cached_provider.isochrones([8.68, 49.41], [150, 300], "time")
+    second = cached_provider.isochrones([8.68, 49.41], [150, 300], "time")
+    assert first == second
+    assert provider.requested_ranges == [[150, 300]]
+
+
+def test_hits_and_misses_per_request(cached_provider):
+    cached_provider.isochrones([8.68, 49.41], [150, 300], "time")
+    cached_provider.isochrones([8.68, 49.41], [150, 300], "time")
+    # A partially cached request counts as a single miss
+    cached_provider.isochrones([8.68, 49.41], [150, 300, 450], "time")
+    assert (cached_provider.hits, cached_provider.misses) == (1, 2)
+
+
+def test_only_missing_ranges_are_requested(cached_provider, provider):
+    cached_provider.isochrones([8.68, 49.41], [150, 300], "time")
+    extended = cached_provider.isochrones([8.68, 49.41], [150, 300, 450],
+                                          "time")
+    assert provider.requested_ranges == [[150, 300], [450]]
+    assert extended == provider.isochrones([8.68, 49.41], [150, 300, 450],
+                                           "time")
+
+
+def test_batch_groups_missing_ranges(cached_provider, provider):
+    cached_provider.isochrones([8.68, 49.41], [150], "time")
+    isochrones = cached_provider.isochrones_batch(
+        [[8.68, 49.41], [8.69, 49.42]], [150, 300], "time")
+    assert provider.requested_ranges == [[150], [300], [150, 300]]
+    assert [[
+        feature['properties']['value'] for feature in isochrone['features']
+    ] for isochrone in isochrones] == [[150, 300], [150, 300]]
@@ -0,0 +1,24 @@
+import pytest
+
+from unrelevant.shared.clustering import cluster_locations, haversine
+
+
+def test_haversine():
+    assert haversine([8.0, 49.0], [8.0, 49.0]) == 0
+    assert haversine([8.0, 49.0], [8.0, 50.0]) == pytest.approx(111195,
+                                                                rel=1e-3)
+
+
+def test_cluster_locations():
+    coords_list = [[8.68, 49.41], [8.69, 49.42], [-70.0, -30.0], [8.70, 49.41]]
+    clusters = cluster_locations(coords_list, radius=1000000)
+    assert clusters.saved_requests == 2
+    assert clusters.members == [[0, 1, 3], [2]]
+    assert clusters.representatives == [1, 2]
+    assert clusters.max_error == pytest.approx(1329, rel=1e-2)
+
+
+def test_cluster_locations_empty():
+    clusters = cluster_locations([], radius=50)
+    assert clusters.saved_requests == 0
+    assert clusters.max_error == 0
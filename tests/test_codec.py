@@ -0,0 +1,57 @@
+import pytest
+
+from unrelevant.shared import codec
+
+
+@pytest.fixture(params=codec.BACKENDS)
+def backend(request):
+    previous = codec.backend_name()
+    codec.set_backend(request.param)
+    if codec.backend_name() != request.param:
+        codec.set_backend(previous)
+        pytest.skip(f"{request.param} not installed")
+    yield request.param
+    codec.set_backend(previous)
+
+
+def test_round_trip(backend):
+    data = {"type": "FeatureCollection", "features": [{"value": 1.5}]}
+    assert codec.loads(codec.dumps(data)) == data
+    assert codec.loads(codec.dumpb(data)) == data
+
+
+def test_numpy_types(backend):
+    numpy = pytest.importorskip("numpy")
+    data = {
+        "count": numpy.int64(3),
+        "ratio": numpy.float32(0.5),
+        "values": numpy.array([1, 2])
+    }
+    assert codec.loads(codec.dumps(data)) == {
+        "count": 3,
+        "ratio": 0.5,
+        "values": [1, 2]
+    }
+
+
+def test_dump_feature_collection(backend, tmp_path):
+    path = str(tmp_path / "result.geojson")
+    features = [{
+        "type": "Feature",
+        "properties": {
+            "id": index
+        },
+        "geometry": None
+    } for index in range(3)]
+    codec.dump_feature_collection(iter(features), path, crs="EPSG:4326")
+    assert codec.load(path) == {
+        "type": "FeatureCollection",
+        "crs": "EPSG:4326",
+        "features": features
+    }
+
+
+def test_unknown_backend_keeps_current():
+    previous = codec.backend_name()
+    codec.set_backend("simdjson")
+    assert codec.backend_name() == previous
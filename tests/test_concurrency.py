@@ -0,0 +1,165 @@
+import asyncio
+import pickle
+
+import pytest
+
+from unrelevant.exceptions.BaseExceptions import CircuitOpenError
+from unrelevant.shared.concurrency import AIMDController, AsyncAdaptiveLimiter, create_controllers, \
+    is_overload_error, run_in_waves
+from unrelevant.shared.resilience import CircuitBreaker, RetryPolicy
+
+
+class StatusError(Exception):
+    def __init__(self, status):
+        self.status = status
+
+
+@pytest.mark.parametrize('error,expected', [(TimeoutError(), True),
+                                            (StatusError(429), True),
+                                            (StatusError(503), True),
+                                            (StatusError(404), False),
+                                            (ValueError(), False)])
+def test_is_overload_error(error, expected):
+    assert is_overload_error(error) == expected
+
+
+def test_additive_increase():
+    controller = AIMDController("ors", initial=2, maximum=4)
+    for _ in range(4):
+        controller.record_success(0.1)
+    assert controller.limit == 3
+    for _ in range(100):
+        controller.record_success(0.1)
+    assert controller.limit == 4
+
+
+def test_multiplicative_decrease_once_per_window():
+    controller = AIMDController("ors", initial=8)
+    for _ in range(8):
+        controller.record_success(0.1)
+    controller.record_failure(StatusError(429))
+    controller.record_failure(StatusError(429))
+    assert controller.limit == 4
+    controller.record_failure(StatusError(404))
+    assert controller.limit == 4
+
+
+def test_latency_target_stops_growth():
+    controller = AIMDController("ors", initial=2, latency_target=1)
+    for _ in range(10):
+        controller.record_success(5)
+    assert controller.limit == 2
+
+
+def test_run_in_waves():
+    controller = AIMDController("ohsome", initial=1, maximum=3)
+    limits = []
+
+    def run_wave(wave, limit):
+        limits.append(limit)
+        return wave
+
+    results = run_in_waves(controller, list(range(1, 30)), run_wave)
+    assert results == list(range(1, 30))
+    assert limits == [1, 2, 3, 3]
+
+
+def test_run_in_waves_decreases_on_failures():
+    controller = AIMDController("ohsome", initial=4)
+    run_in_waves(controller, [None] * 40, lambda wave, limit: wave)
+    assert controller.limit == 1
+
+
+def test_run_in_waves_retries_failed_tasks():
+    controller = AIMDController("ohsome", initial=2)
+    attempts = {}
+
+    def run_wave(wave, limit):
+        results = []
+        for task in wave:
+            attempts[task] = attempts.get(task, 0) + 1
+            # Odd tasks fail on their first attempt, task 3 fails on every attempt
+            failed = task == 3 or (task % 2 and attempts[task] == 1)
+            results.append(None if failed else task)
+        return results
+
+    delays = []
+    results = run_in_waves(controller,
+                           list(range(6)),
+                           run_wave,
+                           is_retryable=lambda result: result is None,
+                           retries=2,
+                           delay=lambda attempt: delays.append(attempt) or 0)
+    assert results == [0, 1, 2, None, 4, 5]
+    assert attempts == {0: 1, 1: 2, 2: 1, 3: 3, 4: 1, 5: 2}
+    assert delays == [0, 1]
+
+
+def overloaded_request(breaker, _, global_tqdm):
+    def request():
+        raise StatusError(503)
+
+    try:
+        RetryPolicy(retries=0, deadline=10).call(request, breaker=breaker)
+    except CircuitOpenError:
+        return "rejected"
+    except StatusError:
+        return None
+    finally:
+        global_tqdm.update()
+
+
+def test_run_in_waves_trips_breaker_through_pool():
+    tqdm_multiprocess = pytest.importorskip("tqdm_multiprocess")
+    import tqdm
+
+    controller = AIMDController("ors", initial=2, maximum=2)
+    breaker = CircuitBreaker("ors", failure_threshold=4, reset_timeout=100)
+
+    def run_wave(wave, limit):
+        pool = tqdm_multiprocess.TqdmMultiProcessPool(limit)
+        try:
+            return pool.map(progress,
+                            wave, lambda result: None, lambda result: None)
+        finally:
+            pool.mp_pool.terminate()
+
+    with tqdm.tqdm(total=16, disable=True) as progress:
+        results = run_in_waves(controller,
+                               [(overloaded_request, (breaker, ))] * 16,
+                               run_wave,
+                               is_failure=lambda result: True,
+                               breaker=breaker)
+    assert breaker.is_open
+    # The first wave reaches the backend, the later waves are sent with the open breaker and rejected
+    assert results[:8] == [None] * 8
+    assert results[8:] == ["rejected"] * 8
+
+
+def test_async_limiter():
+    controller = AIMDController("ors", initial=2)
+    in_flight = []
+
+    async def task(limiter):
+        async with limiter:
+            in_flight.append(1)
+            assert len(in_flight) <= controller.limit
+            await asyncio.sleep(0.01)
+            in_flight.pop()
+
+    async def run():
+        limiter = AsyncAdaptiveLimiter(controller)
+        await asyncio.gather(*[task(limiter) for _ in range(10)])
+
+    asyncio.run(run())
+
+
+def test_create_controllers():
+    controllers = create_controllers({"ors": {
+        "initial": 2
+    }},
+                                     default_initial=3)
+    assert controllers["ors"].limit == 2
+    assert controllers["postgis"].limit == 3
+    restored = pickle.loads(pickle.dumps(controllers["ors"]))
+    restored.record_success(0.1)
@@ -0,0 +1,21 @@
+import pytest
+
+pytest.importorskip("shapely")
+
+from shapely.geometry import Point
+
+from unrelevant.shared.geometry import geometry_wkb, load_geometry
+
+
+def test_load_geometry():
+    point = Point(8.67, 49.41)
+    assert load_geometry(point) is point
+    assert load_geometry(point.wkt).equals(point)
+    assert load_geometry(point.wkb).equals(point)
+
+
+def test_geometry_wkb():
+    polygon = Point(8.67, 49.41).buffer(0.01)
+    assert geometry_wkb(polygon) == polygon.wkb
+    assert geometry_wkb(polygon.wkb) == polygon.wkb
+    assert load_geometry(geometry_wkb(polygon.wkt)).equals(polygon)
@@ -0,0 +1,47 @@
+import pytest
+
+pytest.importorskip("geopandas")
+
+from unrelevant.exceptions.ProviderExceptions import MalformedShapeError
+from unrelevant.shared.normalization import feature_collections_to_frame, parse_lat_lon_shape
+
+
+def test_parse_lat_lon_shape():
+    coordinates = parse_lat_lon_shape(["49.41,8.68", "49.42,8.69"])
+    assert coordinates.tolist() == [[8.68, 49.41], [8.69, 49.42]]
+
+
+@pytest.mark.parametrize("malformed", ["49.3", "49.3,8.6,1", "49.3,abc", ""])
+def test_parse_lat_lon_shape_malformed(malformed):
+    with pytest.raises(MalformedShapeError, match=repr(malformed)):
+        parse_lat_lon_shape(["49.41,8.68", malformed])
+
+
+def test_feature_collections_to_frame():
+    polygon = {
+        'type':
+        'Polygon',
+        'coordinates': [[[8.68, 49.41], [8.69, 49.41], [8.69, 49.42],
+                         [8.68, 49.41]]]
+    }
+    feature_collection = {
+        'type':
+        'FeatureCollection',
+        'features': [{
+            'type': 'Feature',
+            'properties': {
+                'value': value
+            },
+            'geometry': polygon
+        } for value in [150, 300]]
+    }
+    frame = feature_collections_to_frame(
+        [feature_collection, feature_collection], [{
+            'tag1': 'a'
+        }, {
+            'tag1': 'b'
+        }])
+    assert len(frame) == 4
+    assert frame['tag1'].tolist() == ['a', 'a', 'b', 'b']
+    assert frame['value'].tolist() == [150, 300, 150, 300]
+    assert frame.geometry.iloc[0].is_valid
@@ -0,0 +1,73 @@
+import pickle
+
+import pytest
+
+pytest.importorskip("rasterio")
+pytest.importorskip("geopandas")
+
+from unrelevant.UnrelevantBase.Population.PointGridPopulationFetcher import PointGridPopulationFetcher
+
+# The cell centers lie on the half degrees, e.g. the cell with the value 5 is centered on 9.5E/48.5N
+CELL_5 = "POLYGON((9.2 48.8, 9.8 48.8, 9.8 48.2, 9.2 48.2, 9.2 48.8))"
+CELL_10 = "POLYGON((10.2 47.8, 10.8 47.8, 10.8 47.2, 10.2 47.2, 10.2 47.8))"
+CELL_15 = "POLYGON((11.2 46.8, 11.8 46.8, 11.8 46.2, 11.2 46.2, 11.2 46.8))"
+
+
+@pytest.fixture
+def fetcher(population_raster):
+    fetcher = PointGridPopulationFetcher(population_raster, margin=1.0)
+    fetcher.loaded = []
+    load_grid = fetcher._load_grid
+
+    def counting_load_grid(bounds):
+        grid = load_grid(bounds)
+        fetcher.loaded.append(grid[0])
+        return grid
+
+    fetcher._load_grid = counting_load_grid
+    return fetcher
+
+
+def test_grid_covers_the_margin(fetcher):
+    assert fetcher.get_population_data(CELL_5) == 5
+    assert fetcher.loaded == [pytest.approx((8.2, 47.2, 10.8, 49.8))]
+    # Within the margin of the loaded grid
+    assert fetcher.get_population_data(CELL_10) == 10
+    assert len(fetcher.loaded) == 1
+
+
+def test_grid_reloads_outside_of_the_extent(fetcher):
+    assert fetcher.get_population_data(CELL_5) == 5
+    # The grid is loaded around the bounds of the whole batch
+    assert fetcher.get_population_data_many({
+        "a": CELL_10,
+        "b": CELL_15
+    }) == {
+        "a": 10,
+        "b": 15
+    }
+    assert fetcher.loaded[1] == pytest.approx((9.2, 45.2, 12.8, 48.8))
+    assert fetcher.get_population_data(CELL_15) == 15
+    assert len(fetcher.loaded) == 2
+    # Back to the first city
+    assert fetcher.get_population_data(
+        "POLYGON((9.2 49.8, 9.8 49.8, 9.8 49.2, 9.2 49.2, 9.2 49.8))") == 1
+    assert len(fetcher.loaded) == 3
+
+
+def test_grid_is_dropped_on_pickling(population_raster):
+    fetcher = PointGridPopulationFetcher(population_raster)
+    fetcher.get_population_data(CELL_5)
+    restored = pickle.loads(pickle.dumps(fetcher))
+    assert restored._grid is None
+    assert fetcher._grid is not None
+    assert restored.get_population_data(CELL_5) == 5
+
+
+def test_cells_on_the_boundary_are_counted(fetcher):
+    # The polygon has the centers of the nodata cell and the cells 1, 4 and 5 as corners
+    assert fetcher.get_population_data(
+        "POLYGON((8.5 49.5, 9.5 49.5, 9.5 48.5, 8.5 48.5, 8.5 49.5))") == sum(
+            [1, 4, 5])
+    assert fetcher.get_population_data(
+        "POLYGON((20 20, 21 20, 21 21, 20 21, 20 20))") == 0
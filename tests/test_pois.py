@@ -0,0 +1,70 @@
+from unrelevant.shared.pois import build_filter, combine_filters, deduplicate_features, split_by_category
+
+CATEGORIES = {
+    "greenAreas": {
+        "leisure": "park",
+        "landuse": "grass"
+    },
+    "water": {
+        "natural": "beach"
+    }
+}
+
+
+def test_filters():
+    filters = {
+        category: build_filter(tags)
+        for category, tags in CATEGORIES.items()
+    }
+    assert filters["greenAreas"] == "leisure=park or landuse=grass"
+    assert combine_filters(filters.values(
+    )) == "(leisure=park or landuse=grass) or (natural=beach)"
+
+
+def test_split_by_category():
+    filters = {
+        category: build_filter(tags)
+        for category, tags in CATEGORIES.items()
+    }
+    features = [{
+        "properties": {
+            "@osmId": "way/1",
+            "leisure": "park"
+        }
+    }, {
+        "properties": {
+            "@osmId": "way/2",
+            "landuse": "grass",
+            "natural": "beach"
+        }
+    }, {
+        "properties": {
+            "@osmId": "way/3",
+            "leisure": "garden"
+        }
+    }]
+    data = split_by_category({"features": features}, CATEGORIES, filters)
+    assert [
+        feature["properties"]["@osmId"]
+        for feature in data["greenAreas"]["features"]
+    ] == ["way/1", "way/2"]
+    assert [
+        feature["properties"]["@osmId"]
+        for feature in data["water"]["features"]
+    ] == ["way/2"]
+    assert data["water"]["filterQuery"] == "natural=beach"
+
+
+def test_deduplicate_features():
+    features = [{
+        "properties": {
+            "@osmId": "way/1"
+        }
+    }, {
+        "properties": {
+            "@osmId": "way/1"
+        }
+    }, {
+        "properties": {}
+    }]
+    assert deduplicate_features(features) == [features[0], features[2]]
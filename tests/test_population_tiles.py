@@ -0,0 +1,60 @@
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from unrelevant.UnrelevantBase.Population.PopulationTiles import population_statements, read_registry, \
+    statement_names, table_name
+
+
+class RegistryCursor(object):
+    def __init__(self, tables):
+        self._tables = tables
+        self._result = None
+
+    def execute(self, query):
+        if "to_regclass('population_tiles')" in query:
+            registry = "population_tiles" if self._tables is not None else None
+            self._result = [(registry, )]
+        else:
+            self._result = self._tables
+
+    def fetchone(self):
+        return self._result[0]
+
+    def fetchall(self):
+        return self._result
+
+
+def test_table_name():
+    assert table_name("München") == "wpop_munchen"
+    assert table_name("Frankfurt am Main") == "wpop_frankfurt_am_main"
+
+
+def test_statement_names():
+    assert statement_names("wpop") == ("population_sum", "population_sum_many")
+    single, many = statement_names("wpop_koln")
+    assert single.startswith("population_sum_")
+    assert many.startswith("population_sum_many_")
+    assert statement_names("wpop_koln") != statement_names("wpop_bonn")
+    longest = table_name("Sankt Peter-Ording " * 4)
+    assert len(longest) == 63
+    assert all(len(name) <= 63 for name in statement_names(longest))
+
+
+def test_read_registry():
+    assert read_registry(RegistryCursor(None)) == []
+    tables = read_registry(
+        RegistryCursor([("wpop_large", 0, 0, 2, 2),
+                        ("wpop_small", 0, 0, 1, 1)]))
+    assert [table for table, _ in tables] == ["wpop_small", "wpop_large"]
+    assert tables[0][1] == (0, 0, 1, 1)
+
+
+def test_population_statements():
+    statements = population_statements(
+        RegistryCursor([("wpop_koln", 6, 50, 7, 51)]))
+    single, many = statement_names("wpop_koln")
+    assert set(statements.keys()) == {
+        "population_sum", "population_sum_many", single, many
+    }
+    assert "JOIN wpop_koln ON" in statements[many]
@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiohttp")
+pytest.importorskip("openrouteservice")
+
+from aiohttp import web
+
+from unrelevant.UnrelevantBase.Provider.OpenRouteServiceProvider import OpenRouteServiceProvider
+
+
+async def isochrone_handler(request):
+    body = await request.json()
+    return web.json_response({
+        'type':
+        'FeatureCollection',
+        'features': [{
+            'type': 'Feature',
+            'properties': {
+                'group_index': 0,
+                'value': value,
+                'center': body['locations'][0]
+            },
+            'geometry': None
+        } for value in body['range']]
+    })
+
+
+def test_aisochrones_without_session():
+    async def run():
+        app = web.Application()
+        app.router.add_post("/v2/isochrones/{profile}/geojson",
+                            isochrone_handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = runner.addresses[0][1]
+        try:
+            provider = OpenRouteServiceProvider(
+                api_key="key",
+                profile="car",
+                base_url=f"http://127.0.0.1:{port}")
+            # No shared session is passed, so the provider opens its own
+            return await provider.aisochrones([8.68, 49.41], [300, 600],
+                                              "time")
+        finally:
+            await runner.cleanup()
+
+    isochrones = asyncio.run(run())
+    assert [
+        feature['properties']['value'] for feature in isochrones['features']
+    ] == [300, 600]
+
+
+def test_here_shapes_are_parsed_into_arrays():
+    here = pytest.importorskip(
+        "unrelevant.UnrelevantBase.Provider.HereProvider")
+    from unrelevant.shared.normalization import feature_collections_to_frame
+
+    provider = here.HereProvider(api_key="key", profile="car")
+    shape = ["49.41,8.68", "49.42,8.69", "49.42,8.68", "49.41,8.68"]
+    isochrones = provider._parse_isochrones({
+        'response': {
+            'isoline': [{
+                'range': 300,
+                'component': [{
+                    'shape': shape
+                }]
+            }, {
+                'range': 600,
+                'component': [{
+                    'shape': shape
+                }]
+            }]
+        }
+    })
+    assert len(isochrones['features']) == 1
+    shell = isochrones['features'][0]['geometry']['coordinates'][0]
+    assert shell.tolist() == [[8.68, 49.41], [8.69, 49.42], [8.68, 49.42],
+                              [8.68, 49.41]]
+    frame = feature_collections_to_frame([isochrones])
+    assert frame['group_index'].tolist() == [0]
+    assert frame.geometry.iloc[0].is_valid
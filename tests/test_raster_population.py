@@ -0,0 +1,32 @@
+import pickle
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("rasterio")
+pytest.importorskip("shapely")
+
+from unrelevant.UnrelevantBase.Population.RasterPopulationFetcher import RasterPopulationFetcher
+
+
+def test_population_sum(population_raster):
+    fetcher = RasterPopulationFetcher(population_raster)
+    # Cells of the two upper rows, the nodata cell is skipped
+    assert fetcher.get_population_data(
+        "POLYGON((8 50, 12 50, 12 48, 8 48, 8 50))") == sum(range(1, 8))
+    assert fetcher.get_population_data(
+        "POLYGON((20 20, 21 20, 21 21, 20 21, 20 20))") == 0
+
+
+def test_population_many(population_raster):
+    fetcher = pickle.loads(
+        pickle.dumps(RasterPopulationFetcher(population_raster)))
+    assert fetcher.get_population_data_many({
+        "a":
+        "POLYGON((9 47, 10 47, 10 46, 9 46, 9 47))",
+        "b":
+        "POLYGON((8 50, 9 50, 9 49, 8 49, 8 50))"
+    }) == {
+        "a": 13,
+        "b": 0
+    }
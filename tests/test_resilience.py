@@ -0,0 +1,116 @@
+import asyncio
+import pickle
+
+import pytest
+
+from unrelevant.exceptions.BaseExceptions import CircuitOpenError
+from unrelevant.shared.resilience import CircuitBreaker, RetryPolicy, TaskFailure, is_overload_failure, \
+    is_retryable_error, is_retryable_failure
+
+
+class StatusError(Exception):
+    def __init__(self, status):
+        self.status = status
+
+
+class Flaky(object):
+    def __init__(self, failures: int, error: Exception):
+        self.calls = 0
+        self._failures = failures
+        self._error = error
+
+    def __call__(self):
+        self.calls += 1
+        if self.calls <= self._failures:
+            raise self._error
+        return "result"
+
+
+@pytest.mark.parametrize('error,expected', [(StatusError(503), True),
+                                            (StatusError(400), False),
+                                            (ConnectionError(), True),
+                                            (CircuitOpenError("ors"), False)])
+def test_is_retryable_error(error, expected):
+    assert is_retryable_error(error) == expected
+
+
+def test_requests_client_error_is_not_retryable():
+    requests = pytest.importorskip("requests")
+    response = requests.Response()
+    response.status_code = 400
+    response.url = "https://api.ohsome.org/v1/elements/geometry"
+    with pytest.raises(requests.HTTPError) as error:
+        response.raise_for_status()
+    assert not is_retryable_error(error.value)
+    response.status_code = 429
+    assert is_retryable_error(requests.HTTPError(response=response))
+
+
+def test_task_failure():
+    class Response(object):
+        status_code = 429
+
+    class HTTPError(Exception):
+        response = Response()
+
+    failure = pickle.loads(pickle.dumps(TaskFailure(HTTPError("busy"))))
+    assert not failure
+    assert is_overload_failure(failure)
+    assert is_retryable_failure(failure)
+    rejected = TaskFailure(StatusError(400))
+    assert not is_overload_failure(rejected)
+    assert not is_retryable_failure(rejected)
+    assert not is_overload_failure({})
+
+
+def test_retry_until_success():
+    func = Flaky(2, StatusError(503))
+    assert RetryPolicy(retries=3, backoff=0).call(func) == "result"
+    assert func.calls == 3
+
+
+def test_retries_exhausted():
+    func = Flaky(5, StatusError(503))
+    with pytest.raises(StatusError):
+        RetryPolicy(retries=2, backoff=0).call(func)
+    assert func.calls == 3
+
+
+def test_no_retry_for_client_errors():
+    func = Flaky(1, StatusError(400))
+    with pytest.raises(StatusError):
+        RetryPolicy(retries=3, backoff=0).call(func)
+    assert func.calls == 1
+
+
+def test_deadline_stops_retries():
+    func = Flaky(5, StatusError(503))
+    with pytest.raises(StatusError):
+        RetryPolicy(retries=5, backoff=10, jitter=False, deadline=1).call(func)
+    assert func.calls == 1
+
+
+def test_backoff_is_capped():
+    policy = RetryPolicy(backoff=1, backoff_max=5, jitter=False)
+    assert [policy.delay(attempt) for attempt in range(5)] == [1, 2, 4, 5, 5]
+
+
+def test_circuit_breaker():
+    breaker = CircuitBreaker("ors", failure_threshold=2, reset_timeout=100)
+    func = Flaky(2, StatusError(503))
+    with pytest.raises(CircuitOpenError):
+        RetryPolicy(retries=5, backoff=0, deadline=10).call(func,
+                                                            breaker=breaker)
+    assert breaker.is_open
+    breaker.record_success()
+    assert not breaker.is_open
+
+
+def test_async_retry():
+    func = Flaky(1, StatusError(429))
+
+    async def coroutine():
+        return func()
+
+    result = asyncio.run(RetryPolicy(retries=1, backoff=0).acall(coroutine))
+    assert result == "result"
@@ -0,0 +1,21 @@
+import pytest
+
+from unrelevant.shared.rings import prefix_sums
+
+
+def test_prefix_sums():
+    assert prefix_sums([1.0, 2.0, 3.0]) == [1.0, 3.0, 6.0]
+    assert prefix_sums([1.0, None, 3.0]) == [1.0, None, None]
+
+
+def test_nested_rings():
+    pytest.importorskip("shapely")
+    from shapely.geometry import Point
+
+    from unrelevant.shared.rings import nested_rings
+
+    circles = [Point(0, 0).buffer(radius) for radius in [1, 2, 3]]
+    rings = nested_rings(circles)
+    assert rings[0].equals(circles[0])
+    assert rings[1].intersection(rings[0]).area == pytest.approx(0)
+    assert sum(ring.area for ring in rings) == pytest.approx(circles[2].area)
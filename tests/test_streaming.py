@@ -0,0 +1,65 @@
+import json
+
+import pytest
+
+from unrelevant.shared import codec
+from unrelevant.shared.streaming import PoiArrays, iter_features
+
+
+def poi(osm_id, x, y, tags):
+    properties = dict(tags)
+    properties["@osmId"] = osm_id
+    return {
+        "type": "Feature",
+        "properties": properties,
+        "geometry": {
+            "type": "Point",
+            "coordinates": [x, y]
+        }
+    }
+
+
+FEATURES = [
+    poi("way/1", 8.5, 49.1, {"leisure": "park"}),
+    poi("node/2", 8.6, 49.2, {
+        "natural": "beach",
+        "name": "Strand ä"
+    }),
+    poi("way/3", 8.7, 49.3, {"leisure": "park"})
+]
+
+
+def chunked(data: bytes, size: int):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("size", [1, 7, 4096])
+def test_iter_features(size):
+    data = json.dumps(
+        {
+            "attribution": {
+                "text": "© OpenStreetMap contributors"
+            },
+            "type": "FeatureCollection",
+            "features": FEATURES
+        },
+        ensure_ascii=False).encode("utf-8")
+    assert list(iter_features(chunked(data, size))) == FEATURES
+
+
+def test_incomplete_stream():
+    data = json.dumps({"features": FEATURES}).encode("utf-8")[:-10]
+    with pytest.raises(ValueError):
+        list(iter_features([data]))
+
+
+def test_poi_arrays():
+    pois = PoiArrays(FEATURES)
+    assert len(pois) == 3
+    assert list(pois) == FEATURES
+    assert pois[-1] == FEATURES[2]
+    assert len(pois.tags) == 2
+    assert list(pois.tag_codes) == [0, 1, 0]
+    assert codec.loads(codec.dumps({"features": pois})) == {
+        "features": FEATURES
+    }
@@ -0,0 +1,66 @@
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from unrelevant.UnrelevantBase.Provider.SyntheticProvider import SyntheticProvider
+from unrelevant.exceptions.ProviderExceptions import SyntheticProviderError
+
+
+def test_isochrones_shape():
+    provider = SyntheticProvider(profile="bicycle", vertices=16)
+    isochrones = provider.isochrones([8.68, 49.41], [300, 150], "time")
+    assert isochrones['type'] == 'FeatureCollection'
+    assert [
+        feature['properties']['value'] for feature in isochrones['features']
+    ] == [150, 300]
+    ring = isochrones['features'][0]['geometry']['coordinates'][0]
+    assert len(ring) == 17
+    assert ring[0] == ring[-1]
+
+
+def test_isochrones_are_deterministic():
+    first = SyntheticProvider(profile="pedestrian").isochrones([8.68, 49.41],
+                                                               [150], "time")
+    second = SyntheticProvider(profile="pedestrian").isochrones([8.68, 49.41],
+                                                                [150], "time")
+    assert first == second
+
+
+def test_error_rate():
+    provider = SyntheticProvider(profile="car", error_rate=1)
+    with pytest.raises(SyntheticProviderError):
+        provider.isochrones([8.68, 49.41], [150], "distance")
+
+
+def succeeds(provider, coordinates):
+    try:
+        provider.isochrones(coordinates, [150], "time")
+        return True
+    except SyntheticProviderError:
+        return False
+
+
+def pooled_request(provider, coordinates, _, global_tqdm):
+    global_tqdm.update()
+    return succeeds(provider, coordinates)
+
+
+def test_error_rate_through_pool():
+    tqdm_multiprocess = pytest.importorskip("tqdm_multiprocess")
+    import tqdm
+
+    provider = SyntheticProvider(profile="car", error_rate=0.3)
+    tasks = [(pooled_request, (provider, [8.6 + 0.001 * index, 49.4]))
+             for index in range(200)]
+    pool = tqdm_multiprocess.TqdmMultiProcessPool(2)
+    try:
+        with tqdm.tqdm(total=len(tasks), disable=True) as progress:
+            results = pool.map(progress,
+                               tasks, lambda result: None, lambda result: None)
+    finally:
+        pool.mp_pool.terminate()
+    # Each task draws on its own instead of replaying the generator state pickled with the provider
+    assert 0.15 < results.count(False) / len(results) < 0.45
+    assert results == [
+        succeeds(provider, coordinates) for _, (_, coordinates) in tasks
+    ]
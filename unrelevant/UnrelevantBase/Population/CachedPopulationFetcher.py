@@ -0,0 +1,109 @@
+import hashlib
+import logging
+
+from shapely import wkb
+
+from unrelevant.shared.cache import SQLiteLRUCache
+from unrelevant.shared.geometry import load_geometry
+
+logger = logging.getLogger(__name__)
+
+
+class CachedPopulationFetcher(object):
+    """
+    Memoizing wrapper around any population fetcher.
+
+    Sums are keyed on a hash of the normalized WKB of the geometry and the source of the wrapped fetcher.
+    They are kept in memory for the run and optionally persisted in a local sqlite file across runs.
+    """
+
+    def __init__(self,
+                 fetcher,
+                 cache_path: str = None,
+                 max_size_bytes: int = 64 * 1024**2):
+        self._fetcher = fetcher
+        self._source = fetcher.source
+        self._memory = {}
+        self._cache = SQLiteLRUCache(
+            path=cache_path,
+            max_size_bytes=max_size_bytes) if cache_path else None
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def fetcher(self):
+        return self._fetcher
+
+    @property
+    def batch_size(self) -> int:
+        return self._fetcher.batch_size
+
+    @property
+    def source(self) -> str:
+        return self._source
+
+    @property
+    def hits(self) -> int:
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        return self._misses
+
+    def _key(self, geometry) -> str:
+        geometry = load_geometry(geometry)
+        # normalize orders the rings and coordinates canonically, available since shapely 1.8
+        if hasattr(geometry, "normalize"):
+            geometry = geometry.normalize()
+        digest = hashlib.sha1(self._source.encode("utf-8"))
+        digest.update(wkb.dumps(geometry))
+        return digest.hexdigest()
+
+    def _lookup(self, key: str):
+        population = self._memory.get(key)
+        if population is None and self._cache is not None:
+            cached = self._cache.get(key)
+            if cached is not None:
+                population = float(cached.decode("utf-8"))
+                self._memory[key] = population
+        if population is None:
+            self._misses += 1
+        else:
+            self._hits += 1
+        return population
+
+    def _store(self, key: str, population):
+        if population is None:
+            return
+        self._memory[key] = population
+        if self._cache is not None:
+            self._cache.set(key, str(float(population)).encode("utf-8"))
+
+    def get_population_data(self, geometry):
+        key = self._key(geometry)
+        population = self._lookup(key)
+        if population is None:
+            population = self._fetcher.get_population_data(geometry)
+            self._store(key, population)
+        return population
+
+    def get_population_data_many(self, geometries: {}) -> {}:
+        """
+        Only the geometries missing in the cache are passed on to the wrapped fetcher.
+        """
+        populations = {}
+        missing = {}
+        keys = {}
+        for geometry_key, geometry in geometries.items():
+            keys[geometry_key] = self._key(geometry)
+            population = self._lookup(keys[geometry_key])
+            if population is None:
+                missing[geometry_key] = geometry
+            else:
+                populations[geometry_key] = population
+        if len(missing):
+            fetched = self._fetcher.get_population_data_many(missing)
+            for geometry_key, population in fetched.items():
+                self._store(keys[geometry_key], population)
+                populations[geometry_key] = population
+        return populations
@@ -0,0 +1,150 @@
+import logging
+import math
+import os
+import threading
+
+import geopandas
+import numpy
+import rasterio
+from geopandas import GeoSeries, points_from_xy
+from rasterio.errors import WindowError
+from rasterio.windows import Window, from_bounds
+
+from unrelevant.shared.geometry import load_geometry
+
+logger = logging.getLogger(__name__)
+
+# sindex.query accepts arrays of geometries since geopandas 0.12, query_bulk is removed in geopandas 1.0
+_ARRAY_QUERY = tuple(
+    int(part) for part in geopandas.__version__.split(".")[:2]) >= (0, 12)
+
+
+class PointGridPopulationFetcher(object):
+    """
+    Population fetcher summing the population GeoTIFF as a grid of cell centroid points.
+
+    The populated cells around the requested geometries are loaded once as points with their values and indexed
+    in a spatial index. The population of a whole batch of geometries is then summed with one bulk query of the
+    index and a vectorized sum, instead of clipping the raster for every geometry. A cell counts for a geometry
+    if its center lies inside or on the boundary, like the default of the raster backend.
+    The grid is reloaded with a margin around the requested geometries once they leave the loaded extent,
+    so the geometries of one city are served by the same grid.
+    """
+
+    def __init__(self, path: str, batch_size: int = 50, margin: float = 0.1):
+        """
+        @param path: Path to the population GeoTIFF in EPSG:4326.
+        @param batch_size: Number of geometries per get_population_data_many call.
+        @param margin: Margin in degrees added around the requested geometries when the grid is loaded.
+        """
+        self._path = path
+        self._batch_size = max(1, int(batch_size))
+        self._margin = float(margin)
+        self._grid = None
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # The grid is reloaded on demand by the worker
+        state['_grid'] = None
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @property
+    def batch_size(self) -> int:
+        return self._batch_size
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def source(self) -> str:
+        """
+        Identity of the population data. Changes when the raster file is replaced.
+        """
+        stat = os.stat(self._path)
+        return f"points:{os.path.abspath(self._path)}:{stat.st_size}:{stat.st_mtime_ns}"
+
+    @staticmethod
+    def _covers(extent: (), bounds: ()) -> bool:
+        return extent[0] <= bounds[0] and extent[1] <= bounds[1] \
+            and extent[2] >= bounds[2] and extent[3] >= bounds[3]
+
+    def _load_grid(self, bounds: ()):
+        """
+        Read the populated cells within the bounds plus the margin as centroid points.
+        @return: Tuple of the loaded extent, the points with their spatial index and the cell values.
+        """
+        minx, miny, maxx, maxy = bounds
+        with rasterio.open(self._path) as dataset:
+            extent = (minx - self._margin, miny - self._margin,
+                      maxx + self._margin, maxy + self._margin)
+            window = from_bounds(*extent, transform=dataset.transform)
+            # Widen the window to whole cells
+            col_off = math.floor(window.col_off)
+            row_off = math.floor(window.row_off)
+            window = Window(
+                col_off, row_off,
+                math.ceil(window.col_off + window.width) - col_off,
+                math.ceil(window.row_off + window.height) - row_off)
+            try:
+                window = window.intersection(
+                    Window(0, 0, dataset.width, dataset.height))
+            except WindowError:
+                # The geometries lie outside of the raster
+                return extent, None, numpy.empty(0)
+            data = dataset.read(1, window=window, masked=True)
+            transform = dataset.window_transform(window)
+        valid = ~numpy.ma.getmaskarray(data) & (data.data > 0)
+        rows, cols = numpy.nonzero(valid)
+        xs, ys = transform * (cols + 0.5, rows + 0.5)
+        points = GeoSeries(points_from_xy(xs, ys), crs="EPSG:4326")
+        logger.debug(f"Loaded {len(points)} population cells of {extent}.")
+        return extent, points, data.data[valid].astype(numpy.float64)
+
+    def _grid_for(self, bounds: ()):
+        with self._lock:
+            grid = self._grid
+            if grid is None or not self._covers(grid[0], bounds):
+                # The previous grid is dropped, so moving on to the next city doesn't grow the grid
+                grid = self._load_grid(bounds)
+                self._grid = grid
+            return grid
+
+    def _sum_many(self, geometries: []) -> numpy.ndarray:
+        geometries = GeoSeries(geometries, crs="EPSG:4326")
+        _, points, values = self._grid_for(tuple(geometries.total_bounds))
+        if points is None or not len(points):
+            return numpy.zeros(len(geometries))
+        if _ARRAY_QUERY:
+            geometry_indices, point_indices = points.sindex.query(
+                geometries.values, predicate="intersects")
+        else:
+            geometry_indices, point_indices = points.sindex.query_bulk(
+                geometries, predicate="intersects")
+        return numpy.bincount(geometry_indices,
+                              weights=values[point_indices],
+                              minlength=len(geometries))
+
+    def get_population_data(self, geometry):
+        """
+        @param geometry: Shapely geometry, WKB bytes or WKT string.
+        """
+        return float(self._sum_many([load_geometry(geometry)])[0])
+
+    def get_population_data_many(self, geometries: {}) -> {}:
+        """
+        Sum the population of all geometries with a single query of the spatial index.
+        @param geometries: Shapely geometries, WKB bytes or WKT strings by key.
+        @return: Population by key.
+        """
+        keys = list(geometries.keys())
+        if not len(keys):
+            return {}
+        sums = self._sum_many([load_geometry(geometries[key]) for key in keys])
+        return {key: float(value) for key, value in zip(keys, sums)}
@@ -0,0 +1,205 @@
+import hashlib
+import logging
+import re
+import unicodedata
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+# Table of the whole population raster imported by setup.sh
+POPULATION_TABLE = "wpop"
+# Registry of the materialized per-city population tables
+REGISTRY_TABLE = "population_tiles"
+
+_SUM_STATEMENT = """
+    WITH geometry AS (
+        SELECT ST_GeomFromWKB($1::bytea, 4326) AS geom
+    )
+    SELECT
+        (St_SummaryStats(ST_Clip({table}.rast, 1, geometry.geom, true))).sum
+    FROM
+        geometry
+        JOIN {table} ON st_intersects({table}.rast, geometry.geom)
+"""
+
+_SUM_MANY_STATEMENT = """
+    WITH geometries AS (
+        SELECT
+            ordinality - 1 AS id,
+            ST_GeomFromWKB(wkb, 4326) AS geom
+        FROM unnest($1::bytea[]) WITH ORDINALITY AS input(wkb, ordinality)
+    )
+    SELECT
+        geometries.id,
+        SUM((St_SummaryStats(ST_Clip({table}.rast, 1, geometries.geom, true))).sum)
+    FROM
+        geometries
+        JOIN {table} ON st_intersects({table}.rast, geometries.geom)
+    GROUP BY geometries.id
+"""
+
+# Only registered tables that still exist are used
+_REGISTRY_QUERY = f"""
+    SELECT
+        table_name, ST_XMin(extent), ST_YMin(extent), ST_XMax(extent), ST_YMax(extent)
+    FROM {REGISTRY_TABLE}
+    WHERE to_regclass(table_name) IS NOT NULL
+"""
+
+
+def table_name(city: str) -> str:
+    """
+    Name of the population table of a city, e.g. wpop_munchen for München.
+    """
+    name = unicodedata.normalize("NFKD", city).encode("ascii",
+                                                      "ignore").decode("ascii")
+    name = re.sub(r"[^a-z0-9]+", "_", name.lower()).strip("_")
+    return f"{POPULATION_TABLE}_{name}" [:63]
+
+
+def statement_names(table: str) -> (str, str):
+    """
+    @return: Names of the prepared single and batched sum statements of a population table.
+    City tables are referenced by a short hash of their name, so the names stay within the 63 characters
+    of a PostgreSQL identifier.
+    """
+    if table == POPULATION_TABLE:
+        return "population_sum", "population_sum_many"
+    digest = hashlib.sha1(table.encode("utf-8")).hexdigest()[:12]
+    return f"population_sum_{digest}", f"population_sum_many_{digest}"
+
+
+def table_statements(table: str) -> {}:
+    """
+    @return: The sum statements of a population table by their prepared statement names.
+    """
+    single, many = statement_names(table)
+    return {
+        single: _SUM_STATEMENT.format(table=table),
+        many: _SUM_MANY_STATEMENT.format(table=table)
+    }
+
+
+def read_registry(cursor) -> []:
+    """
+    Read the registered city tables.
+    @param cursor: DBAPI cursor.
+    @return: List of the table names and their extents as (minx, miny, maxx, maxy), smallest extent first.
+    """
+    cursor.execute(f"SELECT to_regclass('{REGISTRY_TABLE}')")
+    if cursor.fetchone()[0] is None:
+        return []
+    cursor.execute(_REGISTRY_QUERY)
+    tables = [(row[0], tuple(row[1:])) for row in cursor.fetchall()]
+    return sorted(tables,
+                  key=lambda table: (table[1][2] - table[1][0]) * (table[1][
+                      3] - table[1][1]))
+
+
+def population_statements(cursor) -> {}:
+    """
+    Sum statements of the population table and every registered city table.
+    Passed to get_engine, so new connections prepare the statements of the tables existing at that time.
+    """
+    statements = table_statements(POPULATION_TABLE)
+    for table, _ in read_registry(cursor):
+        statements.update(table_statements(table))
+    return statements
+
+
+def prepare_population_tiles(engine,
+                             cities: {},
+                             margin: float = 0.5,
+                             tile_size: int = 50,
+                             overviews: [] = None) -> []:
+    """
+    Materialize a small tiled population table per city from the population table.
+    Every table covers the bounding box of the city plus the margin, gets a spatial index on the tile hulls,
+    the raster constraints and optional overviews, and is registered with its extent.
+    Existing tables of the cities are replaced.
+    @param engine: SQLAlchemy engine of the population database.
+    @param cities: Bounding boxes as "minx,miny,maxx,maxy" by city name, like the Cities setting.
+    @param margin: Margin in degrees around the bounding boxes, so isochrones reaching out of the city are covered.
+    @param tile_size: Width and height of the tiles in cells.
+    @param overviews: Overview factors, e.g. [4, 16]. The sums always use the full resolution.
+    @return: The names of the created tables.
+    """
+    tables = []
+    with engine.begin() as connection:
+        connection.execute(
+            text(f"""
+    CREATE TABLE IF NOT EXISTS {REGISTRY_TABLE} (
+        city text PRIMARY KEY,
+        table_name text NOT NULL,
+        extent geometry(Polygon, 4326) NOT NULL,
+        tile_size integer NOT NULL,
+        created timestamp NOT NULL DEFAULT now()
+    )"""))
+    for city, bbox in cities.items():
+        table = table_name(city)
+        minx, miny, maxx, maxy = [float(value) for value in bbox.split(",")]
+        extent = {
+            "minx": minx - margin,
+            "miny": miny - margin,
+            "maxx": maxx + margin,
+            "maxy": maxy + margin
+        }
+        logger.info(f"Materializing the population tiles of {city} in {table}")
+        with engine.begin() as connection:
+            for factor in overviews or []:
+                connection.execute(
+                    text(f"DROP TABLE IF EXISTS o_{int(factor)}_{table}"))
+            connection.execute(text(f"DROP TABLE IF EXISTS {table}"))
+            connection.execute(
+                text(f"""
+    CREATE TABLE {table} AS
+    SELECT
+        row_number() OVER () AS rid,
+        tiles.rast
+    FROM (
+        SELECT
+            ST_Tile(ST_Clip({POPULATION_TABLE}.rast, 1, extent.geom, true), :tile_size, :tile_size) AS rast
+        FROM
+            {POPULATION_TABLE},
+            (SELECT ST_MakeEnvelope(:minx, :miny, :maxx, :maxy, 4326) AS geom) AS extent
+        WHERE st_intersects({POPULATION_TABLE}.rast, extent.geom)
+    ) AS tiles"""), {
+                    "tile_size": int(tile_size),
+                    **extent
+                })
+            connection.execute(
+                text(f"ALTER TABLE {table} ADD PRIMARY KEY (rid)"))
+            connection.execute(
+                text(
+                    f"CREATE INDEX {table}_rast_gist ON {table} USING gist (ST_ConvexHull(rast))"
+                ))
+            connection.execute(
+                text(
+                    "SELECT AddRasterConstraints(CAST(:table AS name), 'rast'::name)"
+                ), {"table": table})
+            for factor in overviews or []:
+                connection.execute(
+                    text(
+                        "SELECT ST_CreateOverview(CAST(:table AS regclass), 'rast'::name, :factor)"
+                    ), {
+                        "table": table,
+                        "factor": int(factor)
+                    })
+            connection.execute(
+                text(f"""
+    INSERT INTO {REGISTRY_TABLE} (city, table_name, extent, tile_size)
+    VALUES (:city, :table, ST_MakeEnvelope(:minx, :miny, :maxx, :maxy, 4326), :tile_size)
+    ON CONFLICT (city) DO UPDATE SET
+        table_name = EXCLUDED.table_name,
+        extent = EXCLUDED.extent,
+        tile_size = EXCLUDED.tile_size,
+        created = now()"""), {
+                    "city": city,
+                    "table": table,
+                    "tile_size": int(tile_size),
+                    **extent
+                })
+            connection.execute(text(f"ANALYZE {table}"))
+        tables.append(table)
+    return tables
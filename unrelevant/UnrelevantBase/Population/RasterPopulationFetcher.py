@@ -0,0 +1,104 @@
+import logging
+import os
+import threading
+
+import numpy
+import rasterio
+from rasterio.errors import WindowError
+from rasterio.features import geometry_mask, geometry_window
+from shapely.geometry import mapping
+
+from unrelevant.shared.geometry import load_geometry
+
+logger = logging.getLogger(__name__)
+
+
+class RasterPopulationFetcher(object):
+    """
+    Population fetcher summing the cells of a population GeoTIFF in process, without a database.
+
+    Only the window covering a geometry is read from the raster. The cells are selected with a rasterized mask
+    of the geometry and summed with numpy. Every thread opens its own dataset, since rasterio datasets
+    must not be shared between threads. The datasets are dropped when the fetcher is pickled.
+    """
+
+    def __init__(self,
+                 path: str,
+                 batch_size: int = 50,
+                 all_touched: bool = False):
+        """
+        @param path: Path to the population GeoTIFF in EPSG:4326.
+        @param batch_size: Number of geometries per get_population_data_many call.
+        @param all_touched: Count every cell touched by a geometry instead of the cells with their center inside.
+        """
+        self._path = path
+        self._batch_size = max(1, int(batch_size))
+        self._all_touched = all_touched
+        self._local = threading.local()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_local']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    @property
+    def batch_size(self) -> int:
+        return self._batch_size
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def source(self) -> str:
+        """
+        Identity of the population data. Changes when the raster file is replaced.
+        """
+        stat = os.stat(self._path)
+        return f"raster:{os.path.abspath(self._path)}:{stat.st_size}:{stat.st_mtime_ns}:{self._all_touched}"
+
+    def _dataset(self):
+        dataset = getattr(self._local, 'dataset', None)
+        if dataset is None:
+            dataset = rasterio.open(self._path)
+            self._local.dataset = dataset
+        return dataset
+
+    def _sum(self, geometry) -> float:
+        dataset = self._dataset()
+        shapes = [mapping(geometry)]
+        try:
+            window = geometry_window(dataset, shapes)
+        except WindowError:
+            # The geometry lies outside of the raster
+            return 0.0
+        data = dataset.read(1, window=window, masked=True)
+        if not data.size:
+            return 0.0
+        inside = geometry_mask(shapes,
+                               out_shape=data.shape,
+                               transform=dataset.window_transform(window),
+                               invert=True,
+                               all_touched=self._all_touched)
+        valid = inside & ~numpy.ma.getmaskarray(data)
+        return float(data.data[valid].sum(dtype=numpy.float64))
+
+    def get_population_data(self, geometry):
+        """
+        @param geometry: Shapely geometry, WKB bytes or WKT string.
+        """
+        return self._sum(load_geometry(geometry))
+
+    def get_population_data_many(self, geometries: {}) -> {}:
+        """
+        @param geometries: Shapely geometries, WKB bytes or WKT strings by key.
+        @return: Population by key.
+        """
+        return {
+            key: self.get_population_data(geometry)
+            for key, geometry in geometries.items()
+        }
@@ -1,15 +1,21 @@
+import asyncio
 import logging
+import time
 from abc import ABCMeta
 
+import aiohttp
+
 from unrelevant.exceptions.ProviderExceptions import MissingAPIKeyError
+from unrelevant.shared.concurrency import AIMDController, AsyncAdaptiveLimiter
+from unrelevant.shared.resilience import CircuitBreaker, RetryPolicy
 
 logger = logging.getLogger()
 
 
 class BaseProvider(metaclass=ABCMeta):
-    def __init__(self, name: str, api_key: str):
+    def __init__(self, name: str, api_key: str, requires_api_key: bool = True):
         self._name = name
-        if not api_key or len(api_key) <= 0:
+        if requires_api_key and (not api_key or len(api_key) <= 0):
             raise MissingAPIKeyError(self)
         self._api_key = api_key
         logger.debug(
@@ -17,6 +23,7 @@ class BaseProvider(metaclass=ABCMeta):
         logger.debug(f"Provider name: {name}")
         logger.debug(f"Provider name: {api_key}")
         self._profile = None
+        self._batch_size = 1
 
     @property
     def profile(self):
@@ -30,5 +37,136 @@ class BaseProvider(metaclass=ABCMeta):
     def provider_name(self):
         return self._name
 
+    @property
+    def batch_size(self) -> int:
+        return self._batch_size
+
     def isochrones(self, coordinates: [], iso_range, range_type: str):
         pass
+
+    def feature_range(self, feature: dict, range_type: str):
+        """
+        Range of a single isochrone feature in the unit of the request.
+        Lets the isochrones be cached per range, so extending the ranges only requests the new ones.
+        @param feature: Isochrone feature as returned by this provider.
+        @param range_type: Range type of the request.
+        @return: The range or None if the provider doesn't attribute its features to ranges.
+        """
+        return None
+
+    def isochrones_batch(self, coordinates_list: [], iso_range,
+                         range_type: str) -> []:
+        """
+        Calculate the isochrones for several locations.
+        Providers without multi location support request every location on its own.
+        @param coordinates_list: List of coordinates.
+        @param iso_range: Ranges of the isochrones.
+        @param range_type: Range type of the isochrones.
+        @return: One isochrone result per location in the order of the input.
+        """
+        return [
+            self.isochrones(coordinates, iso_range, range_type)
+            for coordinates in coordinates_list
+        ]
+
+    async def aisochrones(self,
+                          coordinates: [],
+                          iso_range,
+                          range_type: str,
+                          session: aiohttp.ClientSession = None):
+        """
+        Asynchronous counterpart of isochrones.
+        Providers without a native implementation run the blocking call in the default executor.
+        @param session: Shared http session the request should be sent with.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.isochrones, coordinates,
+                                          iso_range, range_type)
+
+    @staticmethod
+    def create_session(concurrency: int,
+                       timeout: float = 300) -> aiohttp.ClientSession:
+        """
+        Create a pooled http session with at most concurrency open connections.
+        """
+        return aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=concurrency),
+            timeout=aiohttp.ClientTimeout(total=timeout))
+
+    @staticmethod
+    async def _fetch_json(session: aiohttp.ClientSession, method: str,
+                          url: str, **kwargs) -> dict:
+        """
+        Send a request and decode the json response.
+        @param session: Shared http session. A session for this request only is opened if None.
+        """
+        if session is None:
+            async with BaseProvider.create_session(1) as own_session:
+                return await BaseProvider._fetch_json(own_session, method, url,
+                                                      **kwargs)
+        async with session.request(method, url, **kwargs) as response:
+            response.raise_for_status()
+            return await response.json(content_type=None)
+
+    async def isochrones_many(self,
+                              coordinates_list: [],
+                              iso_range,
+                              range_type: str,
+                              concurrency: int = 100,
+                              callback=None,
+                              controller: AIMDController = None,
+                              retry_policy: RetryPolicy = None,
+                              breaker: CircuitBreaker = None) -> []:
+        """
+        Calculate the isochrones for many locations concurrently on one shared http session.
+        @param coordinates_list: List of coordinates.
+        @param iso_range: Ranges of the isochrones.
+        @param range_type: Range type of the isochrones.
+        @param concurrency: Maximum number of requests in flight.
+        @param callback: Optional function called after every finished request.
+        @param controller: Optional adaptive controller. The requests in flight then follow its limit, capped by concurrency.
+        @param retry_policy: Optional policy to retry failed requests with.
+        @param breaker: Optional circuit breaker pausing the requests after consecutive failures.
+        @return: One result per location in the order of the input. Failed requests return their exception.
+        """
+        if controller:
+            limiter = AsyncAdaptiveLimiter(controller)
+            concurrency = min(concurrency, controller.maximum)
+        else:
+            limiter = asyncio.Semaphore(concurrency)
+        async with self.create_session(concurrency) as session:
+
+            async def attempt(coordinates):
+                start = time.monotonic()
+                try:
+                    isochrones = await self.aisochrones(coordinates,
+                                                        iso_range,
+                                                        range_type,
+                                                        session=session)
+                except Exception as err:
+                    if controller:
+                        controller.record_failure(err,
+                                                  latency=time.monotonic() -
+                                                  start)
+                    raise err
+                if controller:
+                    controller.record_success(time.monotonic() - start)
+                return isochrones
+
+            async def bounded_isochrones(coordinates):
+                async with limiter:
+                    try:
+                        if retry_policy:
+                            return await retry_policy.acall(attempt,
+                                                            coordinates,
+                                                            breaker=breaker)
+                        return await attempt(coordinates)
+                    finally:
+                        if callback:
+                            callback()
+
+            tasks = [
+                bounded_isochrones(coordinates)
+                for coordinates in coordinates_list
+            ]
+            return await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,206 @@
+import logging
+import math
+
+import aiohttp
+
+from unrelevant.UnrelevantBase.Provider.BaseProvider import BaseProvider
+from unrelevant.shared import codec
+from unrelevant.shared.cache import SQLiteLRUCache, hash_key
+
+logger = logging.getLogger(__name__)
+
+
+class CachedProvider(BaseProvider):
+    """
+    Provider agnostic isochrone cache wrapping any other provider.
+
+    Results are stored in a local sqlite file and keyed on the provider name, profile, rounded coordinates,
+    range and range type. Every range is stored on its own, so only the ranges missing in the cache are requested
+    and merged with the cached ones. Responses of providers that can't attribute their features to ranges are
+    cached as a whole. Only successful responses with features are cached.
+    """
+
+    def __init__(self,
+                 provider: BaseProvider,
+                 cache_path: str,
+                 max_size_bytes: int = 1024**3,
+                 precision: int = 6):
+        self._provider = provider
+        # The wrapped provider already validated its api key
+        super().__init__(name=provider.provider_name,
+                         api_key=provider._api_key,
+                         requires_api_key=False)
+        self._precision = precision
+        self._cache = SQLiteLRUCache(path=cache_path,
+                                     max_size_bytes=max_size_bytes)
+        self._cache.reset_statistics()
+
+    @property
+    def profile(self):
+        return self._provider.profile
+
+    @profile.setter
+    def profile(self, profile):
+        self._provider.profile = profile
+
+    @property
+    def provider(self) -> BaseProvider:
+        return self._provider
+
+    @property
+    def batch_size(self) -> int:
+        return self._provider.batch_size
+
+    @property
+    def cache(self) -> SQLiteLRUCache:
+        return self._cache
+
+    @property
+    def hits(self) -> int:
+        return self._cache.hits
+
+    @property
+    def misses(self) -> int:
+        return self._cache.misses
+
+    def _cache_key(self, coordinates: [], iso_range, range_type: str) -> str:
+        rounded_coordinates = [
+            round(float(coordinate), self._precision)
+            for coordinate in coordinates
+        ]
+        return hash_key(self.provider_name, self.profile, rounded_coordinates,
+                        iso_range, range_type)
+
+    def _range_keys(self, coordinates: [], iso_range, range_type: str) -> dict:
+        return {
+            value: self._cache_key(coordinates, float(value), range_type)
+            for value in iso_range
+        }
+
+    def _lookup(self, coordinates: [], iso_range, range_type: str):
+        """
+        Collect the cached features per range.
+        The lookup counts as one hit if no range is missing and as one miss otherwise.
+        @return: Tuple of the cached features per range and the list of missing ranges,
+        or the complete cached response of providers that can't attribute features to ranges.
+        """
+        cached_ranges = {}
+        missing = []
+        for value, key in self._range_keys(coordinates, iso_range,
+                                           range_type).items():
+            cached = self._cache.get(key, count=False)
+            if cached is not None:
+                cached_ranges[value] = codec.loads(cached)
+            else:
+                missing.append(value)
+        if not len(cached_ranges):
+            cached = self._cache.get(self._cache_key(coordinates,
+                                                     list(iso_range),
+                                                     range_type),
+                                     count=False)
+            if cached is not None:
+                self._cache.record(True)
+                return codec.loads(cached), []
+        self._cache.record(not len(missing))
+        return cached_ranges, missing
+
+    def _split_ranges(self, isochrones: dict, iso_range, range_type: str):
+        """
+        @return: The features of the response per requested range or None if they can't be attributed.
+        """
+        features = {value: [] for value in iso_range}
+        for feature in isochrones.get('features', []):
+            feature_range = self._provider.feature_range(feature, range_type)
+            if feature_range is None:
+                return None
+            value = next((value for value in iso_range if math.isclose(
+                float(value), float(feature_range), abs_tol=1e-6)), None)
+            if value is None:
+                return None
+            features[value].append(feature)
+        return features
+
+    def _complete(self, coordinates: [], iso_range, range_type: str,
+                  cached_ranges: dict, missing: [], isochrones: dict):
+        """
+        Store a fresh response per range and merge it with the cached ranges into the full range set.
+        """
+        if not isochrones or not len(isochrones.get('features', [])):
+            return isochrones
+        split = self._split_ranges(isochrones, missing, range_type)
+        if split is None:
+            if not len(cached_ranges):
+                self._cache.set(
+                    self._cache_key(coordinates, list(iso_range), range_type),
+                    codec.dumpb(isochrones))
+            return isochrones
+        keys = self._range_keys(coordinates, missing, range_type)
+        for value, features in split.items():
+            if len(features):
+                self._cache.set(keys[value], codec.dumpb(features))
+        if not len(cached_ranges):
+            return isochrones
+        return self._merge({**cached_ranges, **split})
+
+    @staticmethod
+    def _merge(features_per_range: dict) -> dict:
+        features = []
+        for value in sorted(features_per_range.keys()):
+            features.extend(features_per_range[value])
+        return {'type': 'FeatureCollection', 'features': features}
+
+    def _merged_or_whole(self, cached) -> dict:
+        if isinstance(cached, dict) and 'features' in cached:
+            return cached
+        return self._merge(cached)
+
+    def isochrones(self, coordinates: [], iso_range, range_type: str):
+        cached_ranges, missing = self._lookup(coordinates, iso_range,
+                                              range_type)
+        if not len(missing):
+            return self._merged_or_whole(cached_ranges)
+        isochrones = self._provider.isochrones(coordinates, missing,
+                                               range_type)
+        return self._complete(coordinates, iso_range, range_type,
+                              cached_ranges, missing, isochrones)
+
+    def isochrones_batch(self, coordinates_list: [], iso_range,
+                         range_type: str) -> []:
+        isochrones = [None] * len(coordinates_list)
+        lookups = [None] * len(coordinates_list)
+        # Locations missing the same ranges are requested together
+        missing_groups = {}
+        for index, coordinates in enumerate(coordinates_list):
+            cached_ranges, missing = self._lookup(coordinates, iso_range,
+                                                  range_type)
+            if not len(missing):
+                isochrones[index] = self._merged_or_whole(cached_ranges)
+                continue
+            lookups[index] = cached_ranges
+            missing_groups.setdefault(tuple(missing), []).append(index)
+        for missing, indices in missing_groups.items():
+            calculated = self._provider.isochrones_batch(
+                [coordinates_list[index] for index in indices], list(missing),
+                range_type)
+            for index, isochrone in zip(indices, calculated):
+                isochrones[index] = self._complete(coordinates_list[index],
+                                                   iso_range,
+                                                   range_type, lookups[index],
+                                                   list(missing), isochrone)
+        return isochrones
+
+    async def aisochrones(self,
+                          coordinates: [],
+                          iso_range,
+                          range_type: str,
+                          session: aiohttp.ClientSession = None):
+        cached_ranges, missing = self._lookup(coordinates, iso_range,
+                                              range_type)
+        if not len(missing):
+            return self._merged_or_whole(cached_ranges)
+        isochrones = await self._provider.aisochrones(coordinates,
+                                                      missing,
+                                                      range_type,
+                                                      session=session)
+        return self._complete(coordinates, iso_range, range_type,
+                              cached_ranges, missing, isochrones)
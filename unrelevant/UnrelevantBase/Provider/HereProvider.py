@@ -1,10 +1,11 @@
 import logging
 
-from geojson import FeatureCollection, Polygon, Feature
+import aiohttp
 from routingpy import HereMaps
 
 from unrelevant.UnrelevantBase.Provider.BaseProvider import BaseProvider
 from unrelevant.exceptions.ProviderExceptions import ProfileNotImplementedError
+from unrelevant.shared.normalization import parse_lat_lon_shape
 
 logger = logging.getLogger(__name__)
 
@@ -24,48 +25,55 @@ class HereProvider(BaseProvider):
         else:
             raise ProfileNotImplementedError(profile, self._name)
 
-    def _post_process_iso(self, isochrone: dict):
-        if isochrone.keys().__contains__("properties"):
-            if not isochrone['properties'].__contains__("group_index"):
-                isochrone['properties']['group_index'] = 0
-        else:
-            isochrone['properties'] = {}
-            isochrone['properties']['group_index'] = 0
-        return isochrone
-
     @staticmethod
-    def _remap_linear_ring(linear_ring):
-        split_linear_ring = []
-        for coordinate in linear_ring:
-            split = coordinate.split(",")
-            split_linear_ring.append([float(split[1]), float(split[0])])
-        return split_linear_ring
+    def _component_to_feature(component: dict) -> dict:
+        # The shell stays a lon/lat array, which feature_collections_to_frame hands to shapely as is
+        return {
+            'type': 'Feature',
+            'properties': {
+                'group_index': 0
+            },
+            'geometry': {
+                'type': 'Polygon',
+                'coordinates': [parse_lat_lon_shape(component['shape'])]
+            }
+        }
 
-    def _component_to_multipolygon(self, components):
-        allPolies = []
-        for component in components:
-            shell = self._remap_linear_ring(component['shape'])
-            allPolies.append(Feature(geometry=Polygon([shell])))
-        return allPolies
-
-    def _response_to_geojson(self, response_data):
-        polygons = list(
-            map(lambda r: self._component_to_multipolygon(r['component']),
-                response_data['response']['isoline']))
-        if len(polygons) > 0:
-            return FeatureCollection(polygons[0])
-        else:
+    def _parse_isochrones(self, response_data: dict):
+        isolines = response_data['response']['isoline']
+        if not len(isolines):
             return {}
+        # Only the first isoline is used, so the others aren't parsed
+        return {
+            'type':
+            'FeatureCollection',
+            'features': [
+                self._component_to_feature(component)
+                for component in isolines[0]['component']
+            ]
+        }
 
     def isochrones(self, coordinates: [], iso_range, range_type: str):
         isochrones = self._api.isochrones(locations=coordinates,
                                           profile=self.profile,
                                           interval_type=range_type,
                                           intervals=iso_range).raw
-        isochrones = self._response_to_geojson(isochrones)
-        if isochrones.__contains__("features"):
-            isochrones['features'] = [
-                self._post_process_iso(isochrone)
-                for isochrone in isochrones['features']
-            ]
-        return isochrones
+        return self._parse_isochrones(isochrones)
+
+    async def aisochrones(self,
+                          coordinates: [],
+                          iso_range,
+                          range_type: str,
+                          session: aiohttp.ClientSession = None):
+        isochrones = await self._fetch_json(
+            session,
+            "GET",
+            "https://isoline.route.ls.hereapi.com/routing/7.2/calculateisoline.json",
+            params={
+                "apiKey": self._api_key,
+                "start": f"geo!{coordinates[1]},{coordinates[0]}",
+                "mode": f"fastest;{self.profile}",
+                "rangetype": range_type,
+                "range": ",".join([str(iso) for iso in iso_range])
+            })
+        return self._parse_isochrones(isochrones)
@@ -1,5 +1,6 @@
 import logging
 
+import aiohttp
 from openrouteservice import Client
 
 from unrelevant.UnrelevantBase.Provider.BaseProvider import BaseProvider
@@ -7,13 +8,20 @@ from unrelevant.exceptions.ProviderExceptions import ProfileNotImplementedError
 
 
 class OpenRouteServiceProvider(BaseProvider):
-    def __init__(self, api_key: str, profile: str, base_url: str = None):
+    def __init__(self,
+                 api_key: str,
+                 profile: str,
+                 base_url: str = None,
+                 batch_size: int = 5):
         super().__init__(name="ors", api_key=api_key)
         if base_url:
             self._api = Client(base_url=base_url)
+            self._base_url = base_url.rstrip("/")
         else:
             self._api = Client(key=self._api_key)
+            self._base_url = "https://api.openrouteservice.org"
         self.profile = profile
+        self._batch_size = max(1, int(batch_size))
 
     @BaseProvider.profile.setter
     def profile(self, profile):
@@ -26,10 +34,60 @@ class OpenRouteServiceProvider(BaseProvider):
         else:
             raise ProfileNotImplementedError(profile, self._name)
 
-    def isochrones(self, coordinates: [], iso_range, range_type):
-        return self._api.isochrones(locations=[coordinates],
+    def _request_isochrones(self, locations: [], iso_range, range_type):
+        return self._api.isochrones(locations=locations,
                                     profile=self.profile,
                                     range=iso_range,
                                     smoothing=0,
                                     range_type=range_type,
                                     validate=False)
+
+    def feature_range(self, feature: dict, range_type: str):
+        return feature.get('properties', {}).get('value')
+
+    @staticmethod
+    def _split_by_group_index(isochrones: dict, locations: int) -> []:
+        """
+        Split a multi location response into one FeatureCollection per location.
+        The group_index of the features is reset to 0 to match single location responses.
+        """
+        split_isochrones = [[] for _ in range(locations)]
+        for feature in isochrones.get('features', []):
+            group_index = int(feature['properties'].get('group_index', 0))
+            feature['properties']['group_index'] = 0
+            split_isochrones[group_index].append(feature)
+        return [{
+            'type': 'FeatureCollection',
+            'features': features
+        } if len(features) else {} for features in split_isochrones]
+
+    def isochrones(self, coordinates: [], iso_range, range_type):
+        return self._request_isochrones([coordinates], iso_range, range_type)
+
+    async def aisochrones(self,
+                          coordinates: [],
+                          iso_range,
+                          range_type: str,
+                          session: aiohttp.ClientSession = None):
+        return await self._fetch_json(
+            session,
+            "POST",
+            f"{self._base_url}/v2/isochrones/{self.profile}/geojson",
+            headers={"Authorization": self._api_key},
+            json={
+                "locations": [coordinates],
+                "range": iso_range,
+                "range_type": range_type,
+                "smoothing": 0
+            })
+
+    def isochrones_batch(self, coordinates_list: [], iso_range,
+                         range_type: str) -> []:
+        isochrones = []
+        for start in range(0, len(coordinates_list), self.batch_size):
+            locations = coordinates_list[start:start + self.batch_size]
+            response = self._request_isochrones(locations, iso_range,
+                                                range_type)
+            isochrones.extend(
+                self._split_by_group_index(response, len(locations)))
+        return isochrones
@@ -0,0 +1,130 @@
+import asyncio
+import logging
+import math
+import random
+import time
+
+import aiohttp
+
+from unrelevant.UnrelevantBase.Provider.BaseProvider import BaseProvider
+from unrelevant.exceptions.ProviderExceptions import ProfileNotImplementedError, SyntheticProviderError
+
+logger = logging.getLogger(__name__)
+
+# Travel speeds in meters per second
+SPEEDS = {"car": 13.9, "bicycle": 4.2, "pedestrian": 1.4}
+
+METERS_PER_DEGREE = 111195.0
+
+
+class SyntheticProvider(BaseProvider):
+    """
+    Offline provider returning deterministic isochrones in the shape of openrouteservice responses.
+
+    The isochrones are circles around the location with a radius of speed * range, or the range itself for distance ranges.
+    The radius of every vertex is jittered by `irregularity` with a random generator seeded by the location,
+    so the same location always yields the same polygons. Latency and error rate are simulated per request.
+    Whether a request fails is drawn from a generator seeded by the request as well, so the error rate holds
+    when the provider is pickled into the tasks of a process pool, and the same request always fails.
+    """
+
+    def __init__(self,
+                 profile: str,
+                 vertices: int = 64,
+                 irregularity: float = 0.2,
+                 latency: float = 0.0,
+                 error_rate: float = 0.0,
+                 seed: int = 0):
+        super().__init__(name="synthetic",
+                         api_key=None,
+                         requires_api_key=False)
+        self.profile = profile
+        self._vertices = max(3, int(vertices))
+        self._irregularity = irregularity
+        self._latency = latency
+        self._error_rate = error_rate
+        self._seed = seed
+
+    @BaseProvider.profile.setter
+    def profile(self, profile):
+        for name in SPEEDS.keys():
+            if name in profile:
+                self._profile = name
+                return
+        raise ProfileNotImplementedError(profile, self._name)
+
+    def _radius(self, iso_range, range_type: str) -> float:
+        if range_type == "distance":
+            return float(iso_range)
+        return SPEEDS[self.profile] * float(iso_range)
+
+    def _polygon(self, coordinates: [], radius: float,
+                 shape: random.Random) -> []:
+        longitude, latitude = coordinates[0], coordinates[1]
+        meters_per_degree_longitude = METERS_PER_DEGREE * math.cos(
+            math.radians(latitude))
+        ring = []
+        for vertex in range(self._vertices):
+            angle = 2 * math.pi * vertex / self._vertices
+            vertex_radius = radius * (1 - self._irregularity * shape.random())
+            ring.append([
+                longitude +
+                vertex_radius * math.cos(angle) / meters_per_degree_longitude,
+                latitude + vertex_radius * math.sin(angle) / METERS_PER_DEGREE
+            ])
+        ring.append(ring[0])
+        return [ring]
+
+    def feature_range(self, feature: dict, range_type: str):
+        return feature['properties']['value']
+
+    def _simulate_failure(self, coordinates: [], iso_range, range_type: str):
+        if self._error_rate <= 0:
+            return
+        # Seeded per request instead of drawing from a shared generator, which every pooled task gets a copy of
+        draw = random.Random(
+            f"{self._seed}:{coordinates[0]:.7f}:{coordinates[1]:.7f}:{sorted(iso_range)}:{range_type}"
+        )
+        if draw.random() < self._error_rate:
+            raise SyntheticProviderError(coordinates)
+
+    def _build_isochrones(self, coordinates: [], iso_range,
+                          range_type: str) -> dict:
+        features = []
+        for value in sorted(iso_range):
+            # Same seed per location and range keeps the result deterministic
+            shape = random.Random(
+                f"{self._seed}:{coordinates[0]:.7f}:{coordinates[1]:.7f}:{value}"
+            )
+            features.append({
+                'type': 'Feature',
+                'properties': {
+                    'group_index': 0,
+                    'value': value,
+                    'center': list(coordinates)
+                },
+                'geometry': {
+                    'type':
+                    'Polygon',
+                    'coordinates':
+                    self._polygon(coordinates, self._radius(value, range_type),
+                                  shape)
+                }
+            })
+        return {'type': 'FeatureCollection', 'features': features}
+
+    def isochrones(self, coordinates: [], iso_range, range_type: str):
+        if self._latency > 0:
+            time.sleep(self._latency)
+        self._simulate_failure(coordinates, iso_range, range_type)
+        return self._build_isochrones(coordinates, iso_range, range_type)
+
+    async def aisochrones(self,
+                          coordinates: [],
+                          iso_range,
+                          range_type: str,
+                          session: aiohttp.ClientSession = None):
+        if self._latency > 0:
+            await asyncio.sleep(self._latency)
+        self._simulate_failure(coordinates, iso_range, range_type)
+        return self._build_isochrones(coordinates, iso_range, range_type)
@@ -1,5 +1,6 @@
 import logging
 
+import aiohttp
 from routingpy import MapboxValhalla, Valhalla
 
 from unrelevant.UnrelevantBase.Provider.BaseProvider import BaseProvider
@@ -13,8 +14,12 @@ class ValhallaProvider(BaseProvider):
         super().__init__(name="valhalla", api_key=api_key)
         if base_url:
             self._api = Valhalla(base_url=base_url, api_key=self._api_key)
+            self._isochrone_url = f"{base_url.rstrip('/')}/isochrone"
+            self._auth_params = {"api_key": self._api_key}
         else:
             self._api = MapboxValhalla(api_key=self._api_key)
+            self._isochrone_url = "https://api.mapbox.com/valhalla/v1/isochrone"
+            self._auth_params = {"access_token": self._api_key}
         self.profile = profile
 
     @BaseProvider.profile.setter
@@ -35,15 +40,52 @@ class ValhallaProvider(BaseProvider):
             isochrone['properties']['group_index'] = 0
         return isochrone
 
-    def isochrones(self, coordinates: [], iso_range, range_type: str):
-        isochrones = self._api.isochrones(locations=coordinates,
-                                          profile=self.profile,
-                                          polygons=True,
-                                          denoise=1,
-                                          intervals=iso_range).raw
+    def feature_range(self, feature: dict, range_type: str):
+        # Valhalla returns the contour times in minutes
+        contour = feature.get('properties', {}).get('contour')
+        return None if contour is None else contour * 60
+
+    def _parse_isochrones(self, isochrones: dict):
         if isochrones.__contains__("features"):
             isochrones['features'] = [
                 self._post_process_iso(isochrone)
                 for isochrone in isochrones['features']
             ]
         return isochrones
+
+    def isochrones(self, coordinates: [], iso_range, range_type: str):
+        isochrones = self._api.isochrones(locations=coordinates,
+                                          profile=self.profile,
+                                          polygons=True,
+                                          denoise=1,
+                                          intervals=iso_range).raw
+        return self._parse_isochrones(isochrones)
+
+    async def aisochrones(self,
+                          coordinates: [],
+                          iso_range,
+                          range_type: str,
+                          session: aiohttp.ClientSession = None):
+        # Valhalla expects the contour times in minutes
+        isochrones = await self._fetch_json(session,
+                                            "POST",
+                                            self._isochrone_url,
+                                            params=self._auth_params,
+                                            json={
+                                                "locations": [{
+                                                    "lon":
+                                                    coordinates[0],
+                                                    "lat":
+                                                    coordinates[1]
+                                                }],
+                                                "costing":
+                                                self.profile,
+                                                "contours": [{
+                                                    "time": iso / 60
+                                                } for iso in iso_range],
+                                                "polygons":
+                                                True,
+                                                "denoise":
+                                                1
+                                            })
+        return self._parse_isochrones(isochrones)
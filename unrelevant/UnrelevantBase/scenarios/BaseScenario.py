@@ -1,12 +1,15 @@
+import asyncio
 import datetime
-import json
 import geojson
 import logging
 import os
+import time
 
 import contextily as ctx
 import matplotlib
 import matplotlib.pyplot as plt
+import requests
+import tqdm
 
 from geopandas import GeoDataFrame
 from ohsome import OhsomeClient
@@ -17,6 +20,11 @@ from unrelevant.UnrelevantBase.Provider.BaseProvider import BaseProvider
 from unrelevant.exceptions.BaseExceptions import OhsomeExtentNotFoundError
 from unrelevant.exceptions.IsochronesExceptions import IsochronesCalculationError
 from unrelevant.exceptions.ProviderExceptions import WrongAPIKeyError
+from unrelevant.shared import codec
+from unrelevant.shared.cache import OhsomeResponseCache
+from unrelevant.shared.concurrency import AIMDController
+from unrelevant.shared.resilience import CircuitBreaker, RetryPolicy
+from unrelevant.shared.streaming import PoiArrays, iter_features
 
 logger = logging.getLogger()
 
@@ -28,18 +36,27 @@ class BaseScenario(object):
                  filter_query: str,
                  provider: BaseProvider = None,
                  range_type: str = "time",
-                 ohsome_api: str = "https://api.ohsome.org/v1"):
+                 ohsome_api: str = "https://api.ohsome.org/v1",
+                 retry_policy: RetryPolicy = None,
+                 circuit_breaker: CircuitBreaker = None,
+                 ohsome_cache: OhsomeResponseCache = None,
+                 ohsome_metadata_path: str = None,
+                 ohsome_metadata_ttl: float = 86400):
         self._name = name
         self._provider = provider
+        self._retry_policy = retry_policy if retry_policy else RetryPolicy()
+        self._circuit_breaker = circuit_breaker if circuit_breaker else CircuitBreaker(
+            name=provider.provider_name)
         self._range_type = range_type
         self._filter_time = filter_time
         self._filter = filter_query
         self._ohsome_client = OhsomeClient(base_api_url=ohsome_api)
+        self._ohsome_cache = ohsome_cache
         self._geometry_results: {} = {}
-        self._ohsome_endpoint_spatial_extent = self._get_ohsome_spatial_extent(
-        )
-        self._ohsome_endpoint_temporal_extent = self._get_ohsome_temporal_extent(
-        )
+        # The ohsome metadata is fetched on first use, so constructing and pickling scenarios stays offline
+        self._ohsome_metadata_path = ohsome_metadata_path
+        self._ohsome_metadata_ttl = ohsome_metadata_ttl
+        self._ohsome_metadata_data = None
         matplotlib.use("agg")
         logger.debug(
             "Base Scenario initialized with the following parameters:")
@@ -75,21 +92,129 @@ class BaseScenario(object):
                        global_tqdm) -> dict:
         data = {}
         try:
-            data = self._provider.isochrones(coords, ranges, self._range_type)
+            data = self._retry_policy.call(self._provider.isochrones,
+                                           coords,
+                                           ranges,
+                                           self._range_type,
+                                           breaker=self._circuit_breaker)
         except (RouterApiError) as err:
             logger.warning(
-                f"API error calculating isochrone. Coords:{coords}, Ranges: {ranges}"
+                f"API error calculating isochrone. Coords:{coords}, Ranges: {ranges}, Error: {err}"
             )
             return {}
         except Exception as err:
             logger.warning(
-                f"Unknown error calculating isochrone. Coords:{coords}, Ranges: {ranges}"
+                f"Unknown error calculating isochrone. Coords:{coords}, Ranges: {ranges}, Error: {err}"
             )
             return {}
-        global_tqdm.update()
+        finally:
+            if global_tqdm:
+                global_tqdm.update()
+        if not data:
+            return {}
         data['filterQuery'] = filter_query
         return data
 
+    def _get_isochrone_batch(self, coords_list: [], filter_queries: [],
+                             ranges: [], _, global_tqdm) -> []:
+        """
+        Calculate the isochrones for a batch of locations with a single provider call.
+        If the batch fails, every location is requested on its own, so a single unroutable location
+        doesn't drop the whole batch.
+        """
+        try:
+            isochrones = self._retry_policy.call(
+                self._provider.isochrones_batch,
+                coords_list,
+                ranges,
+                self._range_type,
+                breaker=self._circuit_breaker)
+        except Exception as err:
+            logger.warning(
+                f"Error calculating isochrone batch of {len(coords_list)} locations. Retrying them one by one. Error: {err}"
+            )
+            return [
+                self._get_isochrone(coords, filter_query, ranges, _,
+                                    global_tqdm)
+                for coords, filter_query in zip(coords_list, filter_queries)
+            ]
+        data = []
+        for isochrone, filter_query in zip(isochrones, filter_queries):
+            if isochrone:
+                isochrone['filterQuery'] = filter_query
+            data.append(isochrone if isochrone else {})
+        if global_tqdm is not None:
+            global_tqdm.update(len(coords_list))
+        return data
+
+    def _get_isochrones_async(self,
+                              coords_list: [],
+                              filter_queries: [],
+                              ranges: [],
+                              concurrency: int,
+                              description: str = "Calculating Isochrones",
+                              controller: AIMDController = None) -> []:
+        """
+        Calculate the isochrones for all locations from a single process with the asynchronous provider interface.
+        Failed locations are logged and returned as empty results like in _get_isochrone.
+        """
+        with tqdm.tqdm(total=len(coords_list),
+                       dynamic_ncols=True,
+                       unit="Isochrones") as global_progress:
+            global_progress.set_description(description)
+            results = asyncio.run(
+                self._provider.isochrones_many(coords_list,
+                                               ranges,
+                                               self._range_type,
+                                               concurrency=concurrency,
+                                               callback=global_progress.update,
+                                               controller=controller,
+                                               retry_policy=self._retry_policy,
+                                               breaker=self._circuit_breaker))
+        data = []
+        for coords, filter_query, isochrone in zip(coords_list, filter_queries,
+                                                   results):
+            if isinstance(isochrone, Exception) or not isochrone:
+                logger.warning(
+                    f"Error calculating isochrone. Coords:{coords}, Ranges: {ranges}, Error: {isochrone}"
+                )
+                data.append({})
+                continue
+            isochrone['filterQuery'] = filter_query
+            data.append(isochrone)
+        return data
+
+    def _retry_failed_isochrones(self, coords_list: [], filter_queries: [],
+                                 ranges: [], isochrones: []) -> []:
+        """
+        Final retry pass over the locations without an isochrone result.
+        The locations are requested one by one after the bulk requests have settled.
+        Locations still failing are reported, so they don't silently disappear from the statistics.
+        """
+        failed = [
+            index for index, isochrone in enumerate(isochrones)
+            if not isochrone
+        ]
+        if not len(failed):
+            return isochrones
+        logger.info(f"Retrying {len(failed)} failed isochrones.")
+        with tqdm.tqdm(total=len(failed),
+                       dynamic_ncols=True,
+                       unit="Isochrones") as global_progress:
+            global_progress.set_description("Retrying failed isochrones")
+            for index in failed:
+                isochrones[index] = self._get_isochrone(
+                    coords_list[index], filter_queries[index], ranges, None,
+                    global_progress)
+        missing = [
+            coords_list[index] for index in failed if not isochrones[index]
+        ]
+        if len(missing):
+            logger.error(
+                f"{len(missing)} isochrones could not be calculated and are excluded from the results. Coords: {missing}"
+            )
+        return isochrones
+
     @staticmethod
     def write_scala_result(full_path_png, png_title, result: GeoDataFrame):
         """
@@ -155,8 +280,9 @@ class BaseScenario(object):
 
         """
         if result.__class__ == GeoDataFrame:
-            with open(full_path_geojson, 'w') as f:
-                json.dump(json.loads(result.to_json()), f)
+            codec.dump_feature_collection(
+                result.iterfeatures(na="null", show_bbox=False),
+                full_path_geojson)
             if plot:
                 result = result.to_crs(epsg=3857)
                 if result.columns.__contains__('range'):
@@ -226,24 +352,120 @@ class BaseScenario(object):
 
         return files
 
+    def _ohsome_post(self, endpoint: str, **params) -> dict:
+        """
+        Post a query to an ohsome endpoint and return the response data.
+        Responses of the current data snapshot are served from the ohsome cache if one is configured.
+        @param endpoint: Path of the endpoint, e.g. elements/centroid.
+        @param params: Query parameters of the endpoint.
+        """
+        if self._ohsome_cache:
+            self._ohsome_cache.set_snapshot(
+                self._ohsome_endpoint_temporal_extent)
+            cached = self._ohsome_cache.get(endpoint, **params)
+            if cached is not None:
+                return codec.loads(cached)
+        client = self._ohsome_client
+        for part in endpoint.split("/"):
+            client = getattr(client, part)
+        data = client.post(**params).data
+        if self._ohsome_cache and 'features' in data:
+            self._ohsome_cache.set(endpoint, codec.dumpb(data), **params)
+        return data
+
+    def _ohsome_stream(self, endpoint: str, **params) -> dict:
+        """
+        Post a query to an ohsome point endpoint and parse the response incrementally into compact POI arrays.
+        The full response is never held in memory, neither as text nor as dict tree.
+        @param endpoint: Path of the endpoint, e.g. elements/centroid.
+        @param params: Query parameters of the endpoint.
+        @return: FeatureCollection with the features as PoiArrays.
+        """
+        if self._ohsome_cache:
+            self._ohsome_cache.set_snapshot(
+                self._ohsome_endpoint_temporal_extent)
+            cached = self._ohsome_cache.get(endpoint, **params)
+            if cached is not None:
+                return {
+                    'type': 'FeatureCollection',
+                    'features': PoiArrays(iter_features([cached]))
+                }
+        url = f"{self._ohsome_client.base_api_url.rstrip('/')}/{endpoint}"
+        with requests.post(url, data=params, stream=True) as response:
+            response.raise_for_status()
+            data = {
+                'type':
+                'FeatureCollection',
+                'features':
+                PoiArrays(
+                    iter_features(response.iter_content(chunk_size=2**16)))
+            }
+        if self._ohsome_cache:
+            self._ohsome_cache.set(endpoint, codec.dumpb(data), **params)
+        return data
+
     def _get_points_by_bbox(self, bbox: str) -> dict:
-        response = {}
+        data = {}
         if bbox:
-            response = self._ohsome_client.elements.centroid.post(
+            data = self._ohsome_post(
+                "elements/centroid",
                 bboxes=bbox,
                 time=self._ohsome_endpoint_temporal_extent,
                 filter=self._filter,
                 properties="tags")
-        if 'features' in response.data.keys():
-            return response.data
+        if 'features' in data.keys():
+            return data
         logger.warning("No results for the given coordinates.")
         return {}
 
     def __del__(self):
         del self._ohsome_client
 
+    @property
+    def _ohsome_metadata(self) -> dict:
+        if self._ohsome_metadata_data is None:
+            self._ohsome_metadata_data = self._load_ohsome_metadata()
+        return self._ohsome_metadata_data
+
+    def _load_ohsome_metadata(self) -> dict:
+        """
+        Read the ohsome metadata from the local metadata file if it is younger than the ttl.
+        Otherwise it is fetched from the ohsome API and persisted.
+        """
+        base_api_url = self._ohsome_client.base_api_url
+        if self._ohsome_metadata_path and os.path.exists(
+                self._ohsome_metadata_path):
+            try:
+                stored = codec.load(self._ohsome_metadata_path)
+                if stored.get('url') == base_api_url and time.time(
+                ) - stored.get('fetched', 0) < self._ohsome_metadata_ttl:
+                    return stored['metadata']
+            except Exception as err:
+                logger.warning(f"Error reading the ohsome metadata: {err}")
+        metadata = self._ohsome_client.metadata
+        if self._ohsome_metadata_path:
+            folder = os.path.dirname(
+                os.path.abspath(self._ohsome_metadata_path))
+            if not os.path.exists(folder):
+                os.makedirs(folder)
+            codec.dump(
+                {
+                    'url': base_api_url,
+                    'fetched': time.time(),
+                    'metadata': metadata
+                }, self._ohsome_metadata_path)
+        return metadata
+
+    @property
+    def _ohsome_endpoint_spatial_extent(self):
+        return self._get_ohsome_spatial_extent()
+
+    @property
+    def _ohsome_endpoint_temporal_extent(self):
+        return self._get_ohsome_temporal_extent()
+
     def _get_ohsome_spatial_extent(self):
-        ohsome_metadata = self._ohsome_client.metadata
+        ohsome_metadata = self._ohsome_metadata
         ohsome_extent = None
         if 'extractRegion' in ohsome_metadata and 'spatialExtent' in ohsome_metadata[
                 'extractRegion']:
@@ -255,7 +477,7 @@ class BaseScenario(object):
         raise OhsomeExtentNotFoundError(self._ohsome_client.base_api_url)
 
     def _get_ohsome_temporal_extent(self):
-        ohsome_metadata = self._ohsome_client.metadata
+        ohsome_metadata = self._ohsome_metadata
         ohsome_extent = None
         if 'extractRegion' in ohsome_metadata and 'temporalExtent' in ohsome_metadata[
                 'extractRegion']:
@@ -1,8 +1,8 @@
 import datetime
-import json
 
 import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
 
 import contextily as ctx
 import matplotlib
@@ -13,16 +13,29 @@ import matplotlib.ticker as mtick
 
 from geopandas import GeoDataFrame
 import geopandas as gp
+from unrelevant.UnrelevantBase.Population.PopulationTiles import POPULATION_TABLE, population_statements, \
+    read_registry, statement_names
 from unrelevant.UnrelevantBase.Provider.BaseProvider import BaseProvider
 from unrelevant.UnrelevantBase.scenarios.BaseScenario import BaseScenario
-from unrelevant.exceptions.BaseExceptions import OhsomeQueryError
+from unrelevant.exceptions.BaseExceptions import OhsomeQueryError, PopulationFetchError
+from unrelevant.shared import codec
+from unrelevant.shared.boundaries import boundary_geometry, geometry_to_feature_collection, merge_boundaries, \
+    simplify_geometry, split_by_boundaries, tile_geometry
+from unrelevant.shared.cache import OhsomeResponseCache
+from unrelevant.shared.clustering import cluster_locations
+from unrelevant.shared.concurrency import AIMDController, create_controllers, run_in_waves
+from unrelevant.shared.database import get_engine
+from unrelevant.shared.geometry import geometry_wkb, load_geometry
+from unrelevant.shared.normalization import feature_collections_to_frame
+from unrelevant.shared.pois import build_filter, combine_filters, deduplicate_features, split_by_category
+from unrelevant.shared.resilience import CircuitBreaker, RetryPolicy, TaskFailure, is_overload_failure, \
+    is_retryable_failure
+from unrelevant.shared.rings import nested_rings, prefix_sums
 import tqdm
 from tqdm_multiprocess import TqdmMultiProcessPool
-from sqlalchemy import create_engine
-from geojson.geometry import MultiPolygon
 from geoalchemy2 import Raster, Geometry
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import Column, Integer
+from sqlalchemy import Column, Integer, text
 
 logger = logging.getLogger()
 
@@ -34,55 +47,126 @@ class PopulationFetcher(Base):
     rast = Column(Raster)
     __tablename__ = 'population'
 
-    def __init__(self, url, port, db, user, password):
+    def __init__(self,
+                 url,
+                 port,
+                 db,
+                 user,
+                 password,
+                 pool_size: int = 10,
+                 max_overflow: int = 10,
+                 batch_size: int = 50,
+                 use_tiles: bool = True):
         self._url = url
         self._port = int(port)
         self._db = db
         self._user = user
         self._password = password
-        self._connection = None
+        self._pool_size = int(pool_size)
+        self._max_overflow = int(max_overflow)
+        self._batch_size = max(1, int(batch_size))
+        self._use_tiles = use_tiles
+        self._tiles = None
+
+    @property
+    def batch_size(self) -> int:
+        """
+        Number of geometries sent per get_population_data_many statement.
+        """
+        return self._batch_size
+
+    @property
+    def source(self) -> str:
+        """
+        Identity of the population data the sums are computed from.
+        """
+        return f"postgis:{self._url}:{self._port}/{self._db}/wpop"
 
     def _connect_to_db(self):
-        engine = create_engine(
-            f'postgresql://{self._user}:{self._password}@{self._url}:{self._port}/{self._db}'
-        )
-        self._connection = engine.connect()
-
-    def _execute_query(self, query):
-        result = None
-        if not self._connection:
-            self._connect_to_db()
+        # The engine is pooled per process and shared by all fetchers of the same database.
+        engine = get_engine(
+            f'postgresql://{self._user}:{self._password}@{self._url}:{self._port}/{self._db}',
+            pool_size=self._pool_size,
+            max_overflow=self._max_overflow,
+            prepared_statements=population_statements)
+        return engine.connect()
+
+    def _tile_tables(self) -> []:
+        """
+        The per-city population tables created with --prepare-population-tiles, read once per fetcher.
+        """
+        if self._tiles is None:
+            tiles = []
+            if self._use_tiles:
+                connection = self._connect_to_db()
+                try:
+                    cursor = connection.connection.cursor()
+                    try:
+                        tiles = read_registry(cursor)
+                    finally:
+                        cursor.close()
+                finally:
+                    connection.close()
+            self._tiles = tiles
+        return self._tiles
+
+    def _table_for(self, geometry) -> str:
+        """
+        Route a geometry to the smallest city table covering it, or to the whole population table.
+        """
+        minx, miny, maxx, maxy = load_geometry(geometry).bounds
+        for table, extent in self._tile_tables():
+            if extent[0] <= minx and extent[1] <= miny and extent[
+                    2] >= maxx and extent[3] >= maxy:
+                return table
+        return POPULATION_TABLE
+
+    def _execute_query(self, query, parameters: {} = None) -> []:
+        # The connection is kept local so queries can run from several threads.
+        # Closing it returns it to the pool.
+        connection = self._connect_to_db()
         try:
-            result = self._connection.execute(query).fetchall()
-        except Exception as err:
-            raise err
+            return connection.execute(query, parameters or {}).fetchall()
         finally:
-            self._connection.close()
-            self._connection = None
-            all_values = 0
-            for pair in result:
-                value = pair[0]
-                if value:
-                    all_values += value
-            return all_values
-
-    def get_population_data(self, wkt_geom: str):
-        query = f"""
-    SELECT(
-        St_SummaryStats(
-            ST_Clip(
-                rast,1,st_geomfromtext('{wkt_geom}', 4326), true)
-            )
-        ).sum
-    FROM
-        wpop
-    WHERE
-        st_intersects(
-                rast,
-                st_geomfromtext('{wkt_geom}', 4326)
-        );
+            connection.close()
+
+    def get_population_data(self, geometry):
+        """
+        @param geometry: Shapely geometry, WKB bytes or WKT string.
+        @return: Population of the geometry.
+        """
+        statement, _ = statement_names(self._table_for(geometry))
+        result = self._execute_query(text(f"EXECUTE {statement}(:geometry)"),
+                                     {"geometry": geometry_wkb(geometry)})
+        all_values = 0
+        for pair in result:
+            value = pair[0]
+            if value:
+                all_values += value
+        return all_values
+
+    def get_population_data_many(self, geometries: {}) -> {}:
         """
-        return self._execute_query(query)
+        Sum the population of several geometries with a single prepared statement per population table.
+        The geometries are bound as one WKB array, which the statement unnests and joins against the raster tiles.
+        @param geometries: Shapely geometries, WKB bytes or WKT strings by key.
+        @return: Population by key. Geometries without population are 0.
+        """
+        populations = {key: 0 for key in geometries.keys()}
+        tables = {}
+        for key, geometry in geometries.items():
+            tables.setdefault(self._table_for(geometry), []).append(key)
+        for table, keys in tables.items():
+            _, statement = statement_names(table)
+            result = self._execute_query(
+                text(f"EXECUTE {statement}(:geometries)"), {
+                    "geometries":
+                    [geometry_wkb(geometries[key]) for key in keys]
+                })
+            for index, value in result:
+                if value:
+                    populations[keys[index]] = value
+        return populations
 
 
 class RecreationScenario(BaseScenario):
@@ -94,18 +178,51 @@ class RecreationScenario(BaseScenario):
                  ohsome_api: str = "https://api.ohsome.org/v1",
                  tags: {} = None,
                  threads: int = 1,
-                 population_fetcher: PopulationFetcher = None):
+                 population_fetcher: PopulationFetcher = None,
+                 asynchronous: bool = False,
+                 concurrency: int = 100,
+                 controllers: {} = None,
+                 retry_policy: RetryPolicy = None,
+                 circuit_breaker: CircuitBreaker = None,
+                 cluster_radius: float = 0,
+                 ohsome_cache: OhsomeResponseCache = None,
+                 combined_poi_query: bool = False,
+                 poi_batch_cities: int = 1,
+                 poi_tile_area: float = 0,
+                 stream_pois: bool = False,
+                 boundary_tolerance: float = 0,
+                 boundary_precision: int = None,
+                 ohsome_metadata_path: str = None,
+                 ohsome_metadata_ttl: float = 86400,
+                 annulus_population: bool = False):
         self._ranges: [] = ranges
         self._cities: dict = cities
         self._tags: dict = tags
         self._threads: int = threads
+        self._asynchronous: bool = asynchronous
+        self._concurrency: int = concurrency
+        self._controllers: {} = controllers if controllers else create_controllers(
+            default_initial=threads)
         self._population_fetcher = population_fetcher
+        self._cluster_radius: float = cluster_radius
+        self._combined_poi_query: bool = combined_poi_query
+        self._poi_batch_cities: int = max(1, int(poi_batch_cities))
+        self._poi_tile_area: float = poi_tile_area
+        self._stream_pois: bool = stream_pois
+        self._boundary_tolerance: float = boundary_tolerance
+        self._boundary_precision: int = boundary_precision
+        self._annulus_population: bool = annulus_population
         super().__init__(name="recreation",
                          filter_time="2018-08-12",
                          filter_query="",
                          provider=provider,
                          range_type=range_type,
-                         ohsome_api=ohsome_api)
+                         ohsome_api=ohsome_api,
+                         retry_policy=retry_policy,
+                         circuit_breaker=circuit_breaker,
+                         ohsome_cache=ohsome_cache,
+                         ohsome_metadata_path=ohsome_metadata_path,
+                         ohsome_metadata_ttl=ohsome_metadata_ttl)
         logger.debug(
             "Recreation Scenario initialized with the following parameters:")
         logger.debug(f"Used ranges: {self._ranges}")
@@ -114,14 +231,16 @@ class RecreationScenario(BaseScenario):
     def _get_city_boundary_task(self, bbox, time, query_filter, properties,
                                 city_name, _, global_tqdm) -> dict:
         try:
-            city_data = self._ohsome_client.elements.geometry.post(
-                bboxes=bbox,
-                time=time,
-                filter=query_filter,
-                properties=properties).data
+            city_data = self._ohsome_post("elements/geometry",
+                                          bboxes=bbox,
+                                          time=time,
+                                          filter=query_filter,
+                                          properties=properties)
             city_data["city"] = city_name
         except Exception as err:
-            raise err
+            logger.warning(
+                f"Error getting the boundary of {city_name}. Error: {err}")
+            return TaskFailure(err)
         global_tqdm.update()
         return city_data
 
@@ -140,16 +259,23 @@ class RecreationScenario(BaseScenario):
             task[i][3],
             task[i][4],
         )) for i in range(len(task))]
-        pool = TqdmMultiProcessPool(self._threads)
         with tqdm.tqdm(total=len(initial_tasks),
                        dynamic_ncols=True,
                        unit="Boundaries") as global_progress:
             global_progress.set_description("Getting city boundaries")
-            processed_boundaries: dict = pool.map(global_progress,
-                                                  initial_tasks,
-                                                  self._on_error,
-                                                  self._done_callback)
-        for city_boundary in processed_boundaries:
+            processed_boundaries: dict = self._map_adaptive(
+                "ohsome", initial_tasks, global_progress,
+                **self._ohsome_failures())
+        for (_, (_, _, _, _,
+                 city_name)), city_boundary in zip(initial_tasks,
+                                                   processed_boundaries):
+            if isinstance(city_boundary, TaskFailure):
+                logger.error(
+                    f"Couldn't get the boundary of {city_name}. The city is skipped. Error: {city_boundary.message}"
+                )
+                continue
+            if not city_boundary:
+                continue
             city_name = city_boundary['city']
             logger.info(f"Processing city boundary for: {city_name}")
             if city_boundary and len(city_boundary['features']):
@@ -163,69 +289,312 @@ class RecreationScenario(BaseScenario):
                                       properties, category, _, global_tqdm):
         data = {}
         try:
-            data: dict = self._ohsome_client.elements.centroid.post(
-                bpolys=bpolys,
-                time=time,
-                filter=query_filter,
-                properties=properties).data
+            ohsome_query = self._ohsome_stream if self._stream_pois else self._ohsome_post
+            data: dict = ohsome_query("elements/centroid",
+                                      bpolys=bpolys,
+                                      time=time,
+                                      filter=query_filter,
+                                      properties=properties)
             data["filterQuery"] = query_filter
             data["category_name"] = category
         except Exception as err:
-            raise err
+            logger.warning(
+                f"Error getting the POIs for {query_filter}. Error: {err}")
+            return TaskFailure(err)
         global_tqdm.update()
         return data
 
-    def _get_city_pois_by_bpolys(self, bpolys: str, city: str) -> dict:
-        # TODO Multithread this
-        data = {}
-        task = []
+    def _category_filters(self) -> dict:
+        filters = {}
         for category in self._tags.keys():
-            filter_query = ""
-            for key, value in self._tags.get(category).items():
-                if len(filter_query) > 0:
-                    filter_query = f"{filter_query} or {key}={value}"
-                else:
-                    filter_query = f"{key}={value}"
+            filter_query = build_filter(self._tags.get(category))
             if len(filter_query):
-                task.append([
-                    bpolys,
-                    self._ohsome_endpoint_temporal_extent,
-                    filter_query,
-                    "tags",
-                    category,
-                ])
+                filters[category] = filter_query
             else:
                 logger.debug(
                     f"No Filter Query constructed for category {category}.")
+        return filters
 
+    def _get_city_pois_by_bpolys(self, bpolys, city: str) -> dict:
+        """
+        Get the POIs per category within the given boundary.
+        @param bpolys: Boundary GeoJSON or a list of them, e.g. the tiles of a large boundary.
+        Several boundaries are fetched in parallel and their POIs are merged without duplicates.
+        @return: FeatureCollection with its filterQuery per category.
+        """
+        bpolys_list = bpolys if isinstance(bpolys, list) else [bpolys]
+        filters = self._category_filters()
+        queries = filters
+        if self._combined_poi_query:
+            queries = {
+                None: combine_filters(filters.values())
+            } if len(filters) else {}
         initial_tasks = [(self._get_city_pois_by_bpolys_task, (
-            task[i][0],
-            task[i][1],
-            task[i][2],
-            task[i][3],
-            task[i][4],
-        )) for i in range(len(task))]
-        pool = TqdmMultiProcessPool(4)
+            tile,
+            self._ohsome_endpoint_temporal_extent,
+            filter_query,
+            "tags",
+            category,
+        )) for tile in bpolys_list
+                         for category, filter_query in queries.items()]
         with tqdm.tqdm(total=len(initial_tasks),
                        dynamic_ncols=True,
                        unit="POIs") as global_progress:
             global_progress.set_description(
                 f"Getting POIs for {city} per category")
-            processed_pois: dict = pool.map(global_progress, initial_tasks,
-                                            self._on_error,
-                                            self._done_callback)
+            processed_pois: dict = self._map_adaptive(
+                "ohsome", initial_tasks, global_progress,
+                **self._ohsome_failures())
+        data = {}
         processed_poi: dict
         for processed_poi in processed_pois:
+            if isinstance(processed_poi, TaskFailure):
+                logger.error(
+                    f"Couldn't get POIs of {city}. They are missing in the results. Error: {processed_poi.message}"
+                )
+                continue
+            if not processed_poi or not 'features' in processed_poi.keys():
+                continue
             category_name = processed_poi.pop('category_name')
-            if not 'features' in processed_poi.keys():
+            if category_name in data:
+                data[category_name]['features'].extend(
+                    processed_poi['features'])
+            else:
+                data[category_name] = processed_poi
+        if len(bpolys_list) > 1:
+            for feature_collection in data.values():
+                feature_collection['features'] = deduplicate_features(
+                    feature_collection['features'])
+        if self._combined_poi_query:
+            data = split_by_category(data[None], self._tags,
+                                     filters) if None in data else {}
+        for category_name in filters.keys():
+            if category_name in data:
+                logger.info(
+                    f"{len(data[category_name]['features'])} POIs found for category {category_name}"
+                )
+            else:
                 logger.info(f"No POIs with category {category_name} found.")
-                continue
-            data[category_name] = processed_poi
-            logger.info(
-                f"{len(data[category_name]['features'])} POIs found for category {category_name}"
-            )
         return data
 
+    def _simplify_boundary(self, boundary: dict) -> dict:
+        """
+        Simplify a boundary for the upload as bpolys. The simplified boundary covers the original one,
+        so the POIs only have to be filtered by the original boundary afterwards.
+        """
+        if self._boundary_tolerance <= 0:
+            return boundary
+        return geometry_to_feature_collection(
+            simplify_geometry(boundary_geometry(boundary),
+                              self._boundary_tolerance,
+                              self._boundary_precision))
+
+    def _get_city_pois(self, boundary: dict, city: str) -> dict:
+        """
+        Get the POIs of a city. Boundaries larger than the tile area are split into tiles fetched in parallel.
+        """
+        query_boundary = self._simplify_boundary(boundary)
+        bpolys = codec.dumps(query_boundary)
+        if self._poi_tile_area > 0:
+            tiles = tile_geometry(boundary_geometry(query_boundary),
+                                  self._poi_tile_area)
+            if len(tiles) > 1:
+                logger.info(f"Splitting {city} into {len(tiles)} tiles")
+                bpolys = [
+                    codec.dumps(geometry_to_feature_collection(tile))
+                    for tile in tiles
+                ]
+        pois = self._get_city_pois_by_bpolys(bpolys=bpolys, city=city)
+        if query_boundary is boundary:
+            return pois
+        geometry = {city: boundary_geometry(boundary)}
+        return {
+            category: split_by_boundaries(feature_collection, geometry)[city]
+            for category, feature_collection in pois.items()
+        }
+
+    def _get_batched_city_pois(self, cities_data: dict) -> dict:
+        """
+        Get the POIs of several cities per ohsome request and assign them back to their cities by location.
+        The ohsome elements endpoints accept several bpolys but don't return which one a feature belongs to.
+        @return: The POIs per category by city.
+        """
+        cities = [
+            city for city in cities_data if 'pois' not in cities_data[city]
+        ]
+        pois = {}
+        for start in range(0, len(cities), self._poi_batch_cities):
+            batch = cities[start:start + self._poi_batch_cities]
+            boundaries = {
+                city: cities_data[city]['boundary']
+                for city in batch
+            }
+            batch_name = ", ".join(batch)
+            logger.info(f"Getting POIs for {batch_name}")
+            batch_pois = self._get_city_pois_by_bpolys(bpolys=codec.dumps(
+                merge_boundaries({
+                    city: self._simplify_boundary(boundary)
+                    for city, boundary in boundaries.items()
+                })),
+                                                       city=batch_name)
+            geometries = {
+                city: boundary_geometry(boundary)
+                for city, boundary in boundaries.items()
+            }
+            for city in batch:
+                pois[city] = {}
+            for category, feature_collection in batch_pois.items():
+                for city, city_pois in split_by_boundaries(
+                        feature_collection, geometries).items():
+                    if len(city_pois['features']):
+                        pois[city][category] = city_pois
+        return pois
+
+    def _controller(self, backend: str) -> AIMDController:
+        if backend not in self._controllers:
+            self._controllers[backend] = AIMDController(name=backend,
+                                                        initial=self._threads)
+        return self._controllers[backend]
+
+    def _ohsome_failures(self) -> dict:
+        """
+        Failure handling of ohsome tasks for _map_adaptive. Overload responses reduce the concurrency
+        and transient failures are run again with the backoff of the retry policy.
+        """
+        return {
+            'is_failure': is_overload_failure,
+            'is_retryable': is_retryable_failure,
+            'retries': self._retry_policy.retries,
+            'delay': self._retry_policy.delay
+        }
+
+    @staticmethod
+    def _close_pool(pool: TqdmMultiProcessPool):
+        pool.mp_pool.terminate()
+        pool.mp_pool.join()
+        pool.mp_manager.shutdown()
+
+    def _map_adaptive(self,
+                      backend: str,
+                      initial_tasks: [],
+                      global_progress,
+                      is_failure=lambda result: not result,
+                      breaker: CircuitBreaker = None,
+                      **retry) -> []:
+        """
+        Run the tasks in a process pool whose size follows the adaptive limit of the backend.
+        The pool is kept for all waves and only recreated when the limit changes.
+        @param breaker: Circuit breaker recording the outcome of every task in this process.
+        @param retry: is_retryable, retries and delay passed on to run_in_waves.
+        """
+        pools = []
+
+        def run_wave(wave, limit):
+            if len(pools) and pools[-1].process_count != limit:
+                self._close_pool(pools.pop())
+            if not len(pools):
+                pools.append(TqdmMultiProcessPool(limit))
+            return pools[-1].map(global_progress, wave, self._on_error,
+                                 self._done_callback)
+
+        try:
+            return run_in_waves(self._controller(backend),
+                                initial_tasks,
+                                run_wave,
+                                is_failure=is_failure,
+                                breaker=breaker,
+                                **retry)
+        finally:
+            for pool in pools:
+                self._close_pool(pool)
+
+    def _get_population_batch(self, geometries: {}):
+        try:
+            return self._population_fetcher.get_population_data_many(
+                {key: geometry.wkb
+                 for key, geometry in geometries.items()})
+        except Exception as err:
+            logger.warning(f"Error fetching the population data: {err}")
+            return None
+
+    def _get_total_population(self, geometry) -> float:
+        try:
+            return self._population_fetcher.get_population_data(geometry.wkb)
+        except Exception as err:
+            raise PopulationFetchError(str(err)) from err
+
+    def _get_populations(self, geometries) -> {}:
+        """
+        Fetch the population of the geometries in batches of several geometries per query.
+        The batches run in parallel threads whose parallelism follows the postgis controller.
+        Failed batches are retried with the retry policy.
+        @param geometries: GeoSeries or dict with the geometries.
+        @return: Population by geometry key.
+        Raises a PopulationFetchError if a batch still fails, so no population is silently left at zero.
+        """
+        keys = list(geometries.keys())
+        batch_size = self._population_fetcher.batch_size
+        batches = [{
+            key: geometries.get(key)
+            for key in keys[start:start + batch_size]
+        } for start in range(0, len(keys), batch_size)]
+
+        def run_wave(wave, limit):
+            with ThreadPoolExecutor(max_workers=limit) as executor:
+                return list(executor.map(self._get_population_batch, wave))
+
+        populations = {}
+        failed = 0
+        for batch_populations in run_in_waves(
+                self._controller("postgis"),
+                batches,
+                run_wave,
+                is_failure=lambda result: result is None,
+                is_retryable=lambda result: result is None,
+                retries=self._retry_policy.retries,
+                delay=self._retry_policy.delay):
+            if batch_populations is None:
+                failed += 1
+            else:
+                populations.update(batch_populations)
+        if failed:
+            raise PopulationFetchError(
+                f"{failed} of {len(batches)} batches failed")
+        return populations
+
+    def _get_annulus_populations(self,
+                                 frame: GeoDataFrame,
+                                 group_by: str = None) -> ({}, {}):
+        """
+        Fetch the population of nested range geometries ring by ring.
+        The rings of consecutive ranges are disjoint, so every raster cell is summed once.
+        The population of a range is the prefix sum of its ring and all smaller rings.
+        @param frame: GeoDataFrame with a range column.
+        @param group_by: Optional column whose groups hold separate nestings, e.g. the tags.
+        @return: Cumulative population and ring population by row key.
+        """
+        groups = frame.groupby(group_by) if group_by else [(None, frame)]
+        ordered_keys = []
+        rings = {}
+        for _, group in groups:
+            group = group.sort_values('range')
+            keys = list(group.index)
+            ordered_keys.append(keys)
+            for key, ring in zip(keys, nested_rings(list(group.geometry))):
+                rings[key] = ring
+        ring_populations = self._get_populations(
+            {key: ring
+             for key, ring in rings.items() if not ring.is_empty})
+        for key, ring in rings.items():
+            if ring.is_empty:
+                ring_populations[key] = 0.0
+        populations = {}
+        for keys in ordered_keys:
+            populations.update(
+                zip(keys,
+                    prefix_sums([ring_populations.get(key) for key in keys])))
+        return populations, ring_populations
+
     @staticmethod
     def _done_callback(result):  # pragma: no cover
         """
@@ -250,22 +619,19 @@ class RecreationScenario(BaseScenario):
         isochrones: {} = {}
         try:
             filter_query = features['filterQuery']
-            task = [[
-                feature['geometry']['coordinates'], feature['properties']
-            ] for feature in features['features']]
-            initial_tasks = [(self._get_isochrone, (
-                task[i][0],
-                task[i][1],
-                ranges,
-            )) for i in range(len(task))]
-            pool = TqdmMultiProcessPool(self._threads)
-            with tqdm.tqdm(total=len(initial_tasks),
-                           dynamic_ncols=True,
-                           unit="Isochrones") as global_progress:
-                global_progress.set_description(threading_description)
-                processed_isochrones = pool.map(global_progress, initial_tasks,
-                                                self._on_error,
-                                                self._done_callback)
+            coords_list = [
+                feature['geometry']['coordinates']
+                for feature in features['features']
+            ]
+            filter_queries = [
+                feature['properties'] for feature in features['features']
+            ]
+            if self._cluster_radius > 0:
+                processed_isochrones = self._get_clustered_isochrones(
+                    coords_list, filter_queries, ranges, threading_description)
+            else:
+                processed_isochrones = self._calculate_isochrones(
+                    coords_list, filter_queries, ranges, threading_description)
 
             for processed_isochrone in processed_isochrones:
                 if len(processed_isochrone) <= 0:
@@ -286,6 +652,73 @@ class RecreationScenario(BaseScenario):
             logger.error(err)
         return isochrones
 
+    def _calculate_isochrones(self, coords_list: [], filter_queries: [],
+                              ranges: [], threading_description: str) -> []:
+        if self._asynchronous:
+            processed_isochrones = self._get_isochrones_async(
+                coords_list,
+                filter_queries,
+                ranges,
+                concurrency=self._concurrency,
+                description=threading_description,
+                controller=self._controller(self._provider.provider_name))
+        else:
+            processed_isochrones = self._get_isochrones_pooled(
+                coords_list, filter_queries, ranges, threading_description)
+        return self._retry_failed_isochrones(coords_list, filter_queries,
+                                             ranges, processed_isochrones)
+
+    def _get_clustered_isochrones(self, coords_list: [], filter_queries: [],
+                                  ranges: [],
+                                  threading_description: str) -> []:
+        """
+        Calculate one isochrone per cluster of nearby POIs and attribute it back to every member POI.
+        """
+        clusters = cluster_locations(coords_list, self._cluster_radius)
+        logger.info(
+            f"Clustering saved {clusters.saved_requests} of {len(coords_list)} isochrone requests. "
+            f"Maximum positional error: {clusters.max_error:.1f} meters")
+        processed_clusters = self._calculate_isochrones(
+            [coords_list[index] for index in clusters.representatives],
+            [filter_queries[index] for index in clusters.representatives],
+            ranges, threading_description)
+        processed_isochrones = [{}] * len(coords_list)
+        for members, processed_cluster in zip(clusters.members,
+                                              processed_clusters):
+            if not processed_cluster:
+                continue
+            for index in members:
+                processed_isochrones[index] = dict(
+                    processed_cluster, filterQuery=filter_queries[index])
+        return processed_isochrones
+
+    def _get_isochrones_pooled(self, coords_list: [], filter_queries: [],
+                               ranges: [], threading_description: str) -> []:
+        batch_size = self._provider.batch_size
+        initial_tasks = [(self._get_isochrone_batch, (
+            coords_list[i:i + batch_size],
+            filter_queries[i:i + batch_size],
+            ranges,
+        )) for i in range(0, len(coords_list), batch_size)]
+        with tqdm.tqdm(total=len(coords_list),
+                       dynamic_ncols=True,
+                       unit="Isochrones") as global_progress:
+            global_progress.set_description(threading_description)
+            processed_batches = self._map_adaptive(
+                self._provider.provider_name,
+                initial_tasks,
+                global_progress,
+                is_failure=lambda batch: not batch or not any(batch),
+                breaker=self._circuit_breaker)
+        # Batches lost in the pool keep their place as empty results for the final retry pass
+        processed_isochrones = []
+        for (_, (batch_coords, _,
+                 _)), processed_batch in zip(initial_tasks, processed_batches):
+            processed_isochrones.extend(
+                processed_batch if processed_batch else [{}] *
+                len(batch_coords))
+        return processed_isochrones
+
     def _postprocess_city_data(self, isochrones: [], points: [], ranges,
                                clip_region):
         gdf_category = GeoDataFrame()
@@ -293,8 +726,9 @@ class RecreationScenario(BaseScenario):
         gdf_tags_dissolved = GeoDataFrame()
         gdf_points = GeoDataFrame()
         boundary = GeoDataFrame.from_features(clip_region, crs="EPSG:4326")
-        total_population = self._population_fetcher.get_population_data(
-            boundary.geometry.get(0).to_wkt())
+        total_population = self._get_total_population(boundary.geometry.get(0))
+        feature_collections = []
+        tag_properties = []
         for tag in isochrones:
             if not isinstance(isochrones[tag],
                               list) or len(isochrones[tag]) <= 0:
@@ -302,14 +736,11 @@ class RecreationScenario(BaseScenario):
             for feature in isochrones[tag]:
                 if len(feature.values()) <= 0 or 'features' not in feature:
                     continue
-                if gdf_tags.empty:
-                    gdf_tags = GeoDataFrame.from_features(feature)
-                    gdf_tags['tag1'] = tag
-
-                else:
-                    gdf_tags = gdf_tags.append(
-                        GeoDataFrame.from_features(feature))
-                    gdf_tags['tag1'] = gdf_tags['tag1'].fillna(tag)
+                feature_collections.append(feature)
+                tag_properties.append({'tag1': tag})
+        if len(feature_collections):
+            gdf_tags = feature_collections_to_frame(feature_collections,
+                                                    tag_properties)
         if not gdf_tags.empty:
             gdf_tags['range'] = gdf_tags['value']
             gdf_tags['tag'] = gdf_tags['tag1']
@@ -347,11 +778,18 @@ class RecreationScenario(BaseScenario):
             gdf_category['total_population'] = total_population
             gdf_tags_dissolved['total_population'] = total_population
 
+            if self._annulus_population:
+                populations, ring_populations = self._get_annulus_populations(
+                    gdf_tags_dissolved, group_by='tag')
+                gdf_tags_dissolved['ring_population'] = [
+                    ring_populations.get(key)
+                    for key in gdf_tags_dissolved.index
+                ]
+            else:
+                populations = self._get_populations(
+                    gdf_tags_dissolved.geometry)
             for geometry_key in gdf_tags_dissolved.geometry.keys():
-                geometry: MultiPolygon = gdf_tags_dissolved.geometry.get(
-                    geometry_key)
-                population = self._population_fetcher.get_population_data(
-                    geometry.to_wkt())
+                population = populations.get(geometry_key)
                 try:
                     if population is not None:
                         gdf_tags_dissolved.at[geometry_key,
@@ -361,11 +799,16 @@ class RecreationScenario(BaseScenario):
                                 population / total_population) * 100
                 except Exception as err:
                     print()
+            if self._annulus_population:
+                populations, ring_populations = self._get_annulus_populations(
+                    gdf_category)
+                gdf_category['ring_population'] = [
+                    ring_populations.get(key) for key in gdf_category.index
+                ]
+            else:
+                populations = self._get_populations(gdf_category.geometry)
             for geometry_key in gdf_category.geometry.keys():
-                geometry: MultiPolygon = gdf_category.geometry.get(
-                    geometry_key)
-                population = self._population_fetcher.get_population_data(
-                    geometry.to_wkt())
+                population = populations.get(geometry_key)
                 if population is not None:
                     gdf_category.at[geometry_key, 'population'] = population
                     gdf_category.at[geometry_key,
@@ -391,24 +834,19 @@ class RecreationScenario(BaseScenario):
     def _get_cities_data(self):
         # TODO redo after development
         cities_data = self._get_city_bounds()
-        logger.debug("Writing city boundaries to temporary file.")
-        with open(
-                "/home/jules/workspace/University/Unrelevant/data/city_bounds.json",
-                "w") as f:
-            json.dump(cities_data, f)
-        with open(
-                "/home/jules/workspace/University/Unrelevant/data/city_bounds.json",
-                "r") as f:
-            cities_data = json.load(f)
         # TODO redo after development
+        batched_pois = self._get_batched_city_pois(
+            cities_data) if self._poi_batch_cities > 1 else {}
 
-        for city in cities_data:
+        # Cities without POIs or population are removed while iterating
+        for city in list(cities_data):
             # TODO redo after development
-            if 'pois' not in cities_data[city]:
+            if city in batched_pois:
+                pois = batched_pois.pop(city)
+            elif 'pois' not in cities_data[city]:
                 logger.info(f"Getting POIs for {city}")
-                pois = self._get_city_pois_by_bpolys(bpolys=json.dumps(
-                    cities_data[city]['boundary']),
-                                                     city=city)
+                pois = self._get_city_pois(cities_data[city]['boundary'],
+                                           city=city)
             else:
                 pois = cities_data[city]['pois']
             if not len(pois):
@@ -419,104 +857,99 @@ class RecreationScenario(BaseScenario):
                 continue
             cities_data[city]['pois'] = pois
             del pois
-            # TODO redo after development
-            if not "isochrones" in cities_data[city]:
-                cities_data[city]['isochrones'] = {}
-            city_boundary = cities_data[city]['boundary']
-
-            boundary = GeoDataFrame.from_features(city_boundary,
-                                                  crs="EPSG:4326")
-            boundary = boundary.dissolve()
-
-            with open(
-                    "/home/jules/workspace/University/Unrelevant/data/city_bounds.json",
-                    "w") as f:
-                json.dump(cities_data, f)
-            with open(
-                    "/home/jules/workspace/University/Unrelevant/data/city_bounds.json",
-                    "r") as f:
-                cities_data = json.load(f)
-            gdf_city = GeoDataFrame()
-            gdf_city['count_pois'] = 0
-
-            total_population = self._population_fetcher.get_population_data(
-                boundary.geometry.get(0).to_wkt())
-
-            for category in cities_data[city]['pois']:
-                logger.info(
-                    f"Getting and processing Isochrones for {city} and category {category}"
+            try:
+                self._process_city(city, cities_data[city])
+            except PopulationFetchError as err:
+                logger.error(
+                    f"Error fetching the population of {city}. Excluding it from the results. Error: {err}"
                 )
-                # TODO redo after development
-                isochrones = self._process_isochrones(
-                    cities_data[city]['pois'][category],
-                    threading_description=f"Calculating Isochrones for {city}")
-                # isochrones = cities_data[city]['isochrones'][category]
-                # TODO redo after development
-
-                gdf_category, gdf_tags, gdf_points = self._postprocess_city_data(
-                    isochrones,
-                    cities_data[city]['pois'][category],
-                    self._ranges,
-                    clip_region=city_boundary)
-                gdf_category['city'] = city
-                gdf_category['category'] = category
-                gdf_tags['city'] = city
-                gdf_tags['category'] = category
-                gdf_points['city'] = city
-
-                gdf_city['count_pois'] += len(gdf_points)
-                gdf_city = gdf_city.append(gdf_category)
-
-                if category not in cities_data[city]['isochrones']:
-                    cities_data[city]['isochrones'][category] = {}
-                if "results_category" not in cities_data[city]['isochrones'][
-                        category]:
-                    cities_data[city]['isochrones'][category][
-                        'results_category'] = {}
-                if "results_tags" not in cities_data[city]['isochrones'][
-                        category]:
-                    cities_data[city]['isochrones'][category][
-                        'results_tags'] = {}
-                if "results_points" not in cities_data[city]['isochrones'][
-                        category]:
-                    cities_data[city]['isochrones'][category][
-                        'results_points'] = {}
-                try:
-                    cities_data[city]['isochrones'][category][
-                        'results_category'] = json.loads(
-                            gdf_category.to_json())
-                    cities_data[city]['isochrones'][category][
-                        'results_tags'] = json.loads(gdf_tags.to_json())
-                    cities_data[city]['isochrones'][category][
-                        'results_points'] = json.loads(gdf_points.to_json())
-                except Exception as err:
-                    logger.error(err)
-            # Total statistics
-            gdf_city = gdf_city.dissolve()
-            gdf_city['population'] = 0.0
-            gdf_city['total_population_percentage'] = 0.0
-            gdf_city['total_population'] = total_population
-            for geometry_key in gdf_city.geometry.keys():
-                geometry: MultiPolygon = gdf_city.geometry.get(geometry_key)
-                population = self._population_fetcher.get_population_data(
-                    geometry.to_wkt())
-                if population is not None:
-                    gdf_city.at[geometry_key, 'population'] = population
-                    gdf_city.at[geometry_key,
-                                'total_population_percentage'] = (
-                                    population / total_population) * 100
+                cities_data.pop(city)
+        return cities_data
+
+    def _process_city(self, city: str, city_data: dict):
+        """
+        Calculate the isochrones of the POIs of a city and store the results with their population in city_data.
+        Raises a PopulationFetchError if the population of the city or of its isochrones can't be fetched.
+        """
+        # TODO redo after development
+        if not "isochrones" in city_data:
+            city_data['isochrones'] = {}
+        city_boundary = city_data['boundary']
 
-            gdf_city['population_poi_ratio'] = gdf_city[
-                'population'] / gdf_city['count_pois']
+        boundary = GeoDataFrame.from_features(city_boundary, crs="EPSG:4326")
+        boundary = boundary.dissolve()
 
-            #  Drop unneeded columns
-            gdf_city = gdf_city.drop(columns=["range", "category"])
+        gdf_city = GeoDataFrame()
+        gdf_city['count_pois'] = 0
 
-            if "results_total" not in cities_data[city]['isochrones']:
-                cities_data[city]['isochrones']['results_total'] = {}
-            cities_data[city]['isochrones']['results_total'] = json.loads(
-                gdf_city.to_json())
-        return cities_data
+        total_population = self._get_total_population(boundary.geometry.get(0))
+
+        for category in city_data['pois']:
+            logger.info(
+                f"Getting and processing Isochrones for {city} and category {category}"
+            )
+            # TODO redo after development
+            isochrones = self._process_isochrones(
+                city_data['pois'][category],
+                threading_description=f"Calculating Isochrones for {city}")
+            # isochrones = city_data['isochrones'][category]
+            # TODO redo after development
+
+            gdf_category, gdf_tags, gdf_points = self._postprocess_city_data(
+                isochrones,
+                city_data['pois'][category],
+                self._ranges,
+                clip_region=city_boundary)
+            gdf_category['city'] = city
+            gdf_category['category'] = category
+            gdf_tags['city'] = city
+            gdf_tags['category'] = category
+            gdf_points['city'] = city
+
+            gdf_city['count_pois'] += len(gdf_points)
+            gdf_city = gdf_city.append(gdf_category)
+
+            if category not in city_data['isochrones']:
+                city_data['isochrones'][category] = {}
+            if "results_category" not in city_data['isochrones'][category]:
+                city_data['isochrones'][category]['results_category'] = {}
+            if "results_tags" not in city_data['isochrones'][category]:
+                city_data['isochrones'][category]['results_tags'] = {}
+            if "results_points" not in city_data['isochrones'][category]:
+                city_data['isochrones'][category]['results_points'] = {}
+            try:
+                city_data['isochrones'][category][
+                    'results_category'] = codec.geodataframe_to_dict(
+                        gdf_category)
+                city_data['isochrones'][category][
+                    'results_tags'] = codec.geodataframe_to_dict(gdf_tags)
+                city_data['isochrones'][category][
+                    'results_points'] = codec.geodataframe_to_dict(gdf_points)
+            except Exception as err:
+                logger.error(err)
+        # Total statistics
+        gdf_city = gdf_city.dissolve()
+        gdf_city['population'] = 0.0
+        gdf_city['total_population_percentage'] = 0.0
+        gdf_city['total_population'] = total_population
+        populations = self._get_populations(gdf_city.geometry)
+        for geometry_key in gdf_city.geometry.keys():
+            population = populations.get(geometry_key)
+            if population is not None:
+                gdf_city.at[geometry_key, 'population'] = population
+                gdf_city.at[geometry_key, 'total_population_percentage'] = (
+                    population / total_population) * 100
+
+        gdf_city['population_poi_ratio'] = gdf_city['population'] / gdf_city[
+            'count_pois']
+
+        #  Drop unneeded columns
+        gdf_city = gdf_city.drop(columns=["range", "category"])
+
+        if "results_total" not in city_data['isochrones']:
+            city_data['isochrones']['results_total'] = {}
+        city_data['isochrones']['results_total'] = codec.geodataframe_to_dict(
+            gdf_city)
 
     def _process_isochrones(
             self,
@@ -798,14 +1231,4 @@ class RecreationScenario(BaseScenario):
 
     def process(self):
         cities_data = self._get_cities_data()
-        logger.debug("Writing cities data to temporary file.")
-        with open(
-                "/home/jules/workspace/University/Unrelevant/data/city_bounds.json",
-                "w") as f:
-            json.dump(cities_data, f)
-        # TODO remove after development
-        with open(
-                "/home/jules/workspace/University/Unrelevant/data/city_bounds.json",
-                "r") as f:
-            cities_data = json.load(f)
         self._geometry_results = cities_data
@@ -69,3 +69,42 @@ class IndexAccessError(BaseError):  # pragma: no cover
         else:
             self.message = message
         super().__init__(self.message)
+
+
+class CircuitOpenError(BaseError):
+    """Exception raised when a backend is paused by its circuit breaker.
+
+    Attributes:
+        name -- name of the backend
+    """
+
+    def __init__(self, name: str):  # pragma: no cover
+        self.expression = name
+        self.message = f"The circuit breaker for {name} is open. Requests are paused after too many consecutive failures."
+        super().__init__(self.message)
+
+
+class PopulationBackendNotImplementedError(BaseError):
+    """Exception raised for errors while accessing a population backend currently not implemented.
+
+    Attributes:
+        expression -- wrong backend
+    """
+
+    def __init__(self, expression: str):  # pragma: no cover
+        self.expression = expression
+        self.message = f"Chosen population backend not found or not implemented {expression}"
+        super().__init__(self.message)
+
+
+class PopulationFetchError(BaseError):
+    """Exception raised when the population of geometries can't be fetched from the population backend.
+
+    Attributes:
+        error -- the cause of the failure
+    """
+
+    def __init__(self, error: str):  # pragma: no cover
+        self.expression = error
+        self.message = f"The population data could not be fetched: {error}"
+        super().__init__(self.message)
@@ -1,6 +1,11 @@
-from unrelevant.UnrelevantBase.Provider import BaseProvider
+from typing import TYPE_CHECKING
+
 from unrelevant.exceptions.BaseExceptions import BaseError
 
+if TYPE_CHECKING:  # pragma: no cover
+    # The providers import these exceptions, so the provider module is only imported for type checking
+    from unrelevant.UnrelevantBase.Provider import BaseProvider
+
 
 class ProfileNotImplementedError(BaseError):  # pragma: no cover
     """Exception raised for errors while accessing a non-existent profile.
@@ -10,7 +15,7 @@ class ProfileNotImplementedError(BaseError):  # pragma: no cover
         provider -- the name of the provider
     """
 
-    def __init__(self, profile: str, provider: BaseProvider):
+    def __init__(self, profile: str, provider: 'BaseProvider'):
         self.message = f"Profile not implemented. Provider: {provider.provider_name}  | Profile: {profile}"
         super().__init__(self.message)
 
@@ -22,7 +27,7 @@ class MissingAPIKeyError(BaseError):  # pragma: no cover
         provider -- the name of the provider
     """
 
-    def __init__(self, provider: BaseProvider):
+    def __init__(self, provider: 'BaseProvider'):
         self.message = f"API Key not set correctly. Provider: {provider.provider_name}"
         super().__init__(self.message)
 
@@ -34,6 +39,33 @@ class WrongAPIKeyError(BaseError):  # pragma: no cover
         provider -- the name of the provider
     """
 
-    def __init__(self, provider: BaseProvider, error):
+    def __init__(self, provider: 'BaseProvider', error):
         self.message = f"API Key set but wrong/rejected. Provider: {provider} with error: {error}"
         super().__init__(self.message)
+
+
+class SyntheticProviderError(BaseError):  # pragma: no cover
+    """Exception raised for the simulated failures of the synthetic provider.
+    Carries a 503 status so it is handled like an overloaded backend.
+
+    Attributes:
+        coordinates -- the requested coordinates
+    """
+
+    def __init__(self, coordinates):
+        self.status = 503
+        self.message = f"Simulated isochrone failure. Coordinates: {coordinates}"
+        super().__init__(self.message)
+
+
+class MalformedShapeError(BaseError):  # pragma: no cover
+    """Exception raised for isochrone shapes whose coordinates can't be parsed.
+
+    Attributes:
+        shape -- the malformed "lat,lon" string
+    """
+
+    def __init__(self, shape):
+        self.expression = shape
+        self.message = f"Malformed coordinate in the isochrone shape. Expected \"lat,lon\", got: {shape!r}"
+        super().__init__(self.message)
@@ -0,0 +1,163 @@
+import logging
+import math
+
+from shapely.geometry import Point, box, mapping, shape
+from shapely.ops import unary_union
+from shapely.prepared import prep
+
+from unrelevant.shared.normalization import geometry_to_shapely
+from unrelevant.shared.streaming import empty_like
+
+logger = logging.getLogger(__name__)
+
+# Approximate size of a degree of latitude in kilometers
+KM_PER_DEGREE = 111.195
+
+
+def boundary_geometry(boundary: dict):
+    """
+    Union of all geometries of a boundary FeatureCollection.
+    """
+    return unary_union([
+        geometry_to_shapely(feature['geometry'])
+        for feature in boundary.get('features', [])
+    ])
+
+
+def merge_boundaries(boundaries: {}) -> dict:
+    """
+    Merge the boundaries of several cities into a single FeatureCollection usable as ohsome bpolys.
+    Every feature gets the city name as id.
+    @param boundaries: Boundary FeatureCollections by city name.
+    """
+    features = []
+    for city, boundary in boundaries.items():
+        for index, feature in enumerate(boundary.get('features', [])):
+            features.append({
+                'type': 'Feature',
+                'id': f"{city}_{index}",
+                'properties': {},
+                'geometry': feature['geometry']
+            })
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+def split_by_boundaries(feature_collection: dict, boundaries: {}) -> {}:
+    """
+    Assign the point features of a query over several boundaries back to the boundaries containing them.
+    A point on a shared border is assigned to every touching boundary, like separate queries would.
+    @param feature_collection: Point features, e.g. an ohsome elements/centroid response.
+    @param boundaries: Shapely geometries by name.
+    @return: FeatureCollection by name with all other members of the input collection.
+    """
+    prepared = {
+        name: (geometry.bounds, prep(geometry))
+        for name, geometry in boundaries.items()
+    }
+    source = feature_collection.get('features', [])
+    features = {name: empty_like(source) for name in boundaries.keys()}
+    for feature in source:
+        x, y = feature['geometry']['coordinates'][:2]
+        point = None
+        for name, (bounds, geometry) in prepared.items():
+            if not (bounds[0] <= x <= bounds[2]
+                    and bounds[1] <= y <= bounds[3]):
+                continue
+            point = point if point else Point(x, y)
+            if geometry.intersects(point):
+                features[name].append(feature)
+    members = {
+        key: value
+        for key, value in feature_collection.items() if key != 'features'
+    }
+    return {
+        name: dict(members, features=name_features)
+        for name, name_features in features.items()
+    }
+
+
+def geometry_to_feature_collection(geometry) -> dict:
+    return {
+        'type':
+        'FeatureCollection',
+        'features': [{
+            'type': 'Feature',
+            'properties': {},
+            'geometry': mapping(geometry)
+        }]
+    }
+
+
+def area_km2(geometry) -> float:
+    """
+    Approximate area of a lon/lat geometry in square kilometers, scaled at its mean latitude.
+    """
+    latitude = (geometry.bounds[1] + geometry.bounds[3]) / 2
+    return geometry.area * KM_PER_DEGREE**2 * math.cos(math.radians(latitude))
+
+
+def tile_geometry(geometry, max_area_km2: float) -> []:
+    """
+    Split a lon/lat geometry along a regular grid into tiles of about max_area_km2 of the bounding box.
+    @return: The non empty parts of the geometry per grid cell. Small geometries are returned as a single tile.
+    """
+    if geometry.is_empty:
+        return []
+    min_x, min_y, max_x, max_y = geometry.bounds
+    bounds_area = area_km2(box(min_x, min_y, max_x, max_y))
+    tiles_per_axis = math.ceil(math.sqrt(bounds_area / max_area_km2))
+    if tiles_per_axis <= 1:
+        return [geometry]
+    width = (max_x - min_x) / tiles_per_axis
+    height = (max_y - min_y) / tiles_per_axis
+    tiles = []
+    for column in range(tiles_per_axis):
+        for row in range(tiles_per_axis):
+            cell = box(min_x + column * width, min_y + row * height,
+                       min_x + (column + 1) * width,
+                       min_y + (row + 1) * height)
+            tile = geometry.intersection(cell)
+            if tile.geom_type == 'GeometryCollection':
+                # ohsome only accepts polygonal bpolys
+                tile = unary_union(
+                    [part for part in tile.geoms if part.area > 0])
+            if not tile.is_empty and tile.area > 0:
+                tiles.append(tile)
+    return tiles
+
+
+def _round_coordinates(coordinates, precision: int):
+    if isinstance(coordinates[0], (int, float)):
+        return [round(coordinate, precision) for coordinate in coordinates]
+    return [
+        _round_coordinates(coordinate, precision) for coordinate in coordinates
+    ]
+
+
+def simplify_geometry(geometry, tolerance_m: float, precision: int = None):
+    """
+    Simplify a lon/lat boundary for upload while still covering the original geometry.
+    The geometry is simplified with the tolerance and grown by the tolerance and the rounding error,
+    so no point of the original geometry falls outside. The coordinates are rounded to precision decimals.
+    @param geometry: Polygonal lon/lat geometry.
+    @param tolerance_m: Simplification tolerance in meters.
+    @param precision: Optional number of decimals of the coordinates.
+    @return: The simplified geometry or the original one if it couldn't be simplified safely.
+    """
+    tolerance = tolerance_m / (KM_PER_DEGREE * 1000)
+    # Rounding moves every coordinate by at most half a unit of the last decimal per axis
+    rounding_error = 10**-precision if precision is not None else 0
+    simplified = geometry.simplify(tolerance, preserve_topology=True).buffer(
+        tolerance + rounding_error, resolution=2)
+    if precision is not None:
+        rounded = shape({
+            'type':
+            simplified.geom_type,
+            'coordinates':
+            _round_coordinates(mapping(simplified)['coordinates'], precision)
+        })
+        simplified = rounded if rounded.is_valid else rounded.buffer(0)
+    if not simplified.covers(geometry):
+        logger.debug("Simplified boundary doesn't cover the original one.")
+        return geometry
+    return simplified
@@ -0,0 +1,255 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def hash_key(*parts) -> str:
+    """
+    Build a stable cache key from arbitrary json serializable parts.
+    @param parts: Values that identify the cached entry.
+    @return: Hex digest of the serialized parts.
+    """
+    serialized = json.dumps(parts, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(serialized.encode("utf-8")).hexdigest()
+
+
+class SQLiteLRUCache(object):
+    """
+    File backed key value store with a size cap and least recently used eviction.
+
+    The store is safe to use from several processes and threads. Every thread opens its own sqlite connection
+    lazily. The connections are dropped when the object is pickled, so instances can be shipped to pool workers.
+    Hits and misses are counted inside the database to aggregate them over all workers.
+    """
+
+    def __init__(self, path: str, max_size_bytes: int = 1024**3):
+        self._path = os.path.abspath(path)
+        self._max_size_bytes = int(max_size_bytes)
+        self._local = threading.local()
+        folder = os.path.dirname(self._path)
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+        self._init_db()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_local']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    @property
+    def path(self):
+        return self._path
+
+    @property
+    def max_size_bytes(self):
+        return self._max_size_bytes
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if not connection:
+            connection = sqlite3.connect(self._path, timeout=60)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.connection = connection
+        return connection
+
+    def _init_db(self):
+        connection = self._connect()
+        with connection:
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    value BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL
+                )""")
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS entries_last_access ON entries(last_access)"
+            )
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS statistics (
+                    name TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL
+                )""")
+            connection.executemany(
+                "INSERT OR IGNORE INTO statistics(name, value) VALUES (?, 0)",
+                [("hits", ), ("misses", )])
+
+    def _count(self, connection: sqlite3.Connection, name: str):
+        connection.execute(
+            "UPDATE statistics SET value = value + 1 WHERE name = ?", (name, ))
+
+    def get(self, key: str, count: bool = True):
+        """
+        Return the stored value for the key and mark it as recently used.
+        @param key: Key of the entry.
+        @param count: Count the lookup as hit or miss. Callers combining several keys per lookup pass False
+        and count the lookup with record.
+        @return: The stored bytes or None if the key is unknown.
+        """
+        connection = self._connect()
+        with connection:
+            row = connection.execute("SELECT value FROM entries WHERE key = ?",
+                                     (key, )).fetchone()
+            if row is None:
+                if count:
+                    self._count(connection, "misses")
+                return None
+            connection.execute(
+                "UPDATE entries SET last_access = ? WHERE key = ?",
+                (time.time(), key))
+            if count:
+                self._count(connection, "hits")
+        return bytes(row[0])
+
+    def record(self, hit: bool):
+        """
+        Count a lookup made of uncounted get calls as hit or miss.
+        """
+        connection = self._connect()
+        with connection:
+            self._count(connection, "hits" if hit else "misses")
+
+    def set(self, key: str, value: bytes):
+        """
+        Store a value and evict the least recently used entries if the size cap is exceeded.
+        @param key: Key of the entry.
+        @param value: Bytes to store.
+        """
+        if isinstance(value, str):
+            value = value.encode("utf-8")
+        if len(value) > self._max_size_bytes:
+            logger.debug(
+                f"Cache entry too large to be stored: {len(value)} bytes")
+            return
+        connection = self._connect()
+        with connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO entries(key, value, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, sqlite3.Binary(value), len(value), time.time()))
+            self._evict(connection)
+
+    def _evict(self, connection: sqlite3.Connection):
+        total = connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self._max_size_bytes:
+            return
+        evicted = 0
+        for key, size in connection.execute(
+                "SELECT key, size FROM entries ORDER BY last_access ASC"
+        ).fetchall():
+            if total <= self._max_size_bytes:
+                break
+            connection.execute("DELETE FROM entries WHERE key = ?", (key, ))
+            total -= size
+            evicted += 1
+        logger.debug(f"Evicted {evicted} cache entries from {self._path}")
+
+    def __contains__(self, key: str):
+        row = self._connect().execute("SELECT 1 FROM entries WHERE key = ?",
+                                      (key, )).fetchone()
+        return row is not None
+
+    def __len__(self):
+        return self._connect().execute(
+            "SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    @property
+    def size_bytes(self) -> int:
+        return self._connect().execute(
+            "SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    @property
+    def hits(self) -> int:
+        return self._statistic("hits")
+
+    @property
+    def misses(self) -> int:
+        return self._statistic("misses")
+
+    def _statistic(self, name: str) -> int:
+        row = self._connect().execute(
+            "SELECT value FROM statistics WHERE name = ?",
+            (name, )).fetchone()
+        return row[0] if row else 0
+
+    def reset_statistics(self):
+        connection = self._connect()
+        with connection:
+            connection.execute("UPDATE statistics SET value = 0")
+
+    def clear(self):
+        connection = self._connect()
+        with connection:
+            connection.execute("DELETE FROM entries")
+            connection.execute("UPDATE statistics SET value = 0")
+
+    def close(self):
+        """
+        Close the connection of the calling thread.
+        """
+        connection = getattr(self._local, 'connection', None)
+        if connection:
+            connection.close()
+            self._local.connection = None
+
+
+class OhsomeResponseCache(object):
+    """
+    Cache of ohsome responses keyed on the endpoint and the query parameters.
+
+    Every entry belongs to the data snapshot, i.e. the toTimestamp of the ohsome temporal extent.
+    Once the snapshot advances, the responses of the old snapshot are dropped.
+    """
+
+    _SNAPSHOT_KEY = "ohsome-snapshot"
+
+    def __init__(self, path: str, max_size_bytes: int = 1024**3):
+        self._cache = SQLiteLRUCache(path=path, max_size_bytes=max_size_bytes)
+        self._snapshot = None
+
+    @property
+    def cache(self) -> SQLiteLRUCache:
+        return self._cache
+
+    @property
+    def snapshot(self):
+        return self._snapshot
+
+    def set_snapshot(self, snapshot: str):
+        """
+        Set the current data snapshot and invalidate the responses of older snapshots.
+        @param snapshot: The toTimestamp of the ohsome temporal extent.
+        """
+        if snapshot == self._snapshot:
+            return
+        if self._SNAPSHOT_KEY in self._cache:
+            stored = self._cache.get(self._SNAPSHOT_KEY).decode("utf-8")
+            if stored != snapshot:
+                logger.info(
+                    f"Ohsome data advanced from {stored} to {snapshot}. Clearing the ohsome cache."
+                )
+                self._cache.clear()
+        self._cache.set(self._SNAPSHOT_KEY, snapshot.encode("utf-8"))
+        self._snapshot = snapshot
+
+    def key(self, endpoint: str, **params) -> str:
+        return hash_key(self._snapshot, endpoint, params)
+
+    def get(self, endpoint: str, **params):
+        """
+        @return: The cached response bytes or None.
+        """
+        return self._cache.get(self.key(endpoint, **params))
+
+    def set(self, endpoint: str, response: bytes, **params):
+        self._cache.set(self.key(endpoint, **params), response)
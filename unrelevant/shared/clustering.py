@@ -0,0 +1,83 @@
+import logging
+import math
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS = 6371008.8
+
+
+def haversine(first: [], second: []) -> float:
+    """
+    Great circle distance between two lon/lat coordinates.
+    @return: Distance in meters.
+    """
+    lon1, lat1, lon2, lat2 = map(math.radians,
+                                 [first[0], first[1], second[0], second[1]])
+    a = math.sin(
+        (lat2 - lat1) / 2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(
+            (lon2 - lon1) / 2)**2
+    return 2 * EARTH_RADIUS * math.asin(math.sqrt(a))
+
+
+class LocationClusters(object):
+    """
+    Result of snapping locations to a metric grid.
+
+    Attributes:
+        representatives -- index of the location standing in for each cluster
+        members -- indices of all locations per cluster, aligned with representatives
+        max_error -- largest distance in meters between a location and its representative
+    """
+
+    def __init__(self, representatives: [], members: [], max_error: float,
+                 locations: int):
+        self.representatives = representatives
+        self.members = members
+        self.max_error = max_error
+        self._locations = locations
+
+    @property
+    def saved_requests(self) -> int:
+        return self._locations - len(self.representatives)
+
+
+def cluster_locations(coords_list: [], radius: float) -> LocationClusters:
+    """
+    Snap lon/lat locations to a grid with cells of `radius` meters and group the locations per cell.
+    The location closest to the cell mean represents the cluster, so requests start from a real POI.
+    @param coords_list: List of lon/lat coordinates.
+    @param radius: Grid cell size in meters.
+    @return: The clusters in order of their first member.
+    """
+    if not len(coords_list):
+        return LocationClusters([], [], 0.0, 0)
+    reference_latitude = math.radians(
+        sum(coords[1] for coords in coords_list) / len(coords_list))
+    meters_per_degree = math.pi * EARTH_RADIUS / 180
+    cells = {}
+    for index, coords in enumerate(coords_list):
+        x = coords[0] * meters_per_degree * math.cos(reference_latitude)
+        y = coords[1] * meters_per_degree
+        cells.setdefault((math.floor(x / radius), math.floor(y / radius)),
+                         []).append(index)
+
+    representatives = []
+    members = []
+    max_error = 0.0
+    for cell_members in cells.values():
+        mean = [
+            sum(coords_list[index][axis]
+                for index in cell_members) / len(cell_members)
+            for axis in range(2)
+        ]
+        representative = min(
+            cell_members,
+            key=lambda index: haversine(coords_list[index], mean))
+        for index in cell_members:
+            max_error = max(
+                max_error,
+                haversine(coords_list[index], coords_list[representative]))
+        representatives.append(representative)
+        members.append(cell_members)
+    return LocationClusters(representatives, members, max_error,
+                            len(coords_list))
@@ -0,0 +1,181 @@
+import json
+import logging
+import sys
+from collections.abc import Sequence
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import ujson
+except ImportError:  # pragma: no cover
+    ujson = None
+
+BACKENDS = ["orjson", "ujson", "json"]
+
+
+def _default(obj):
+    """
+    Serialize the types the json backends don't know, mainly numpy scalars and arrays from pandas frames
+    and sequences like the compact POI arrays.
+    numpy is only looked up if it was already imported, since no numpy objects can exist otherwise.
+    """
+    numpy = sys.modules.get("numpy")
+    if numpy is not None:
+        if isinstance(obj, numpy.integer):
+            return int(obj)
+        if isinstance(obj, numpy.floating):
+            return float(obj)
+        if isinstance(obj, numpy.bool_):
+            return bool(obj)
+        if isinstance(obj, numpy.ndarray):
+            return obj.tolist()
+    if isinstance(obj, (set, Sequence)):
+        return list(obj)
+    if hasattr(obj, "__geo_interface__"):
+        return obj.__geo_interface__
+    raise TypeError(f"Object of type {type(obj).__name__} is not serializable")
+
+
+class _OrjsonBackend(object):
+    name = "orjson"
+
+    @staticmethod
+    def dumps(obj) -> bytes:
+        return orjson.dumps(obj,
+                            default=_default,
+                            option=orjson.OPT_SERIALIZE_NUMPY
+                            | orjson.OPT_NON_STR_KEYS)
+
+    @staticmethod
+    def loads(data):
+        return orjson.loads(data)
+
+
+class _UjsonBackend(object):
+    name = "ujson"
+
+    @staticmethod
+    def dumps(obj) -> bytes:
+        try:
+            return ujson.dumps(obj, ensure_ascii=False).encode("utf-8")
+        except (TypeError, OverflowError):
+            # ujson has no hook for unknown types
+            return _JsonBackend.dumps(obj)
+
+    @staticmethod
+    def loads(data):
+        return ujson.loads(data)
+
+
+class _JsonBackend(object):
+    name = "json"
+
+    @staticmethod
+    def dumps(obj) -> bytes:
+        return json.dumps(obj, default=_default,
+                          ensure_ascii=False).encode("utf-8")
+
+    @staticmethod
+    def loads(data):
+        return json.loads(data)
+
+
+_AVAILABLE_BACKENDS = {
+    "orjson": _OrjsonBackend if orjson else None,
+    "ujson": _UjsonBackend if ujson else None,
+    "json": _JsonBackend
+}
+
+_backend = next(_AVAILABLE_BACKENDS[name] for name in BACKENDS
+                if _AVAILABLE_BACKENDS[name])
+
+
+def set_backend(name: str):
+    """
+    Select the json backend by name. Falls back to the fastest available backend if it isn't installed.
+    @param name: One of orjson, ujson or json.
+    """
+    global _backend
+    backend = _AVAILABLE_BACKENDS.get(name)
+    if not backend:
+        logger.warning(
+            f"Json backend {name} not available. Using {_backend.name}.")
+        return
+    _backend = backend
+
+
+def backend_name() -> str:
+    return _backend.name
+
+
+def dumpb(obj) -> bytes:
+    """
+    Serialize an object to utf-8 encoded json.
+    """
+    return _backend.dumps(obj)
+
+
+def dumps(obj) -> str:
+    """
+    Serialize an object to a json string.
+    """
+    return _backend.dumps(obj).decode("utf-8")
+
+
+def loads(data):
+    """
+    Deserialize a json string or bytes.
+    """
+    return _backend.loads(data)
+
+
+def dump(obj, path: str):
+    """
+    Write an object as json to a file.
+    """
+    with open(path, "wb") as f:
+        f.write(dumpb(obj))
+
+
+def load(path: str):
+    """
+    Read a json file.
+    """
+    with open(path, "rb") as f:
+        return loads(f.read())
+
+
+def dump_feature_collection(features, path: str, **members):
+    """
+    Stream features into a GeoJSON FeatureCollection file one feature at a time,
+    so the whole collection never has to be serialized in memory.
+    @param features: Iterable of GeoJSON features, e.g. GeoDataFrame.iterfeatures().
+    @param path: Path of the output file.
+    @param members: Additional top level members of the FeatureCollection.
+    """
+    with open(path, "wb") as f:
+        f.write(b'{"type":"FeatureCollection",')
+        for key, value in members.items():
+            f.write(dumpb(key) + b":" + dumpb(value) + b",")
+        f.write(b'"features":[')
+        for index, feature in enumerate(features):
+            if index:
+                f.write(b",")
+            f.write(dumpb(feature))
+        f.write(b"]}")
+
+
+def geodataframe_to_dict(gdf) -> dict:
+    """
+    Convert a GeoDataFrame to a GeoJSON FeatureCollection dict without the string round trip of to_json.
+    The values may still be numpy types, which all functions of this module serialize.
+    """
+    return {
+        'type': 'FeatureCollection',
+        'features': list(gdf.iterfeatures(na="null", show_bbox=False))
+    }
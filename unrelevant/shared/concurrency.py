@@ -0,0 +1,274 @@
+import asyncio
+import logging
+import math
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ["ors", "valhalla", "here", "ohsome", "postgis"]
+
+OVERLOAD_STATUS_CODES = [429, 500, 502, 503, 504]
+
+
+def error_status(error: Exception):
+    """
+    Read the http status code from the common attributes of the used api clients,
+    including the response of requests errors.
+    @param error: The raised exception.
+    @return: The status code or None.
+    """
+    for source in [error, getattr(error, "response", None)]:
+        for attribute in ["status", "status_code", "error_code"]:
+            try:
+                return int(getattr(source, attribute))
+            except (AttributeError, TypeError, ValueError):
+                continue
+    return None
+
+
+def is_overload_error(error: Exception) -> bool:
+    """
+    Check if an error signals an overloaded backend, e.g. a timeout or an http 429/5xx.
+    @param error: The raised exception.
+    """
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError)):
+        return True
+    if "timeout" in type(error).__name__.lower():
+        return True
+    return error_status(error) in OVERLOAD_STATUS_CODES
+
+
+class AIMDController(object):
+    """
+    Additive increase, multiplicative decrease concurrency limit for a single backend.
+
+    The limit grows by `increase` per full window of healthy requests and is multiplied by `decrease`
+    on timeouts and overload responses. It is decreased at most once per window, so a burst of failures
+    from the requests already in flight only counts once.
+    """
+
+    def __init__(self,
+                 name: str,
+                 initial: int = 4,
+                 minimum: int = 1,
+                 maximum: int = 16,
+                 increase: float = 1.0,
+                 decrease: float = 0.5,
+                 latency_target: float = None,
+                 error_threshold: float = 0.1,
+                 smoothing: float = 0.2):
+        self._name = name
+        self._minimum = max(1, int(minimum))
+        self._maximum = max(self._minimum, int(maximum))
+        self._limit = float(
+            min(max(int(initial), self._minimum), self._maximum))
+        self._increase = increase
+        self._decrease = decrease
+        self._latency_target = latency_target
+        self._error_threshold = error_threshold
+        self._smoothing = smoothing
+        self._latency = None
+        self._error_rate = 0.0
+        self._since_decrease = 0
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def minimum(self) -> int:
+        return self._minimum
+
+    @property
+    def maximum(self) -> int:
+        return self._maximum
+
+    @property
+    def latency(self):
+        return self._latency
+
+    @property
+    def error_rate(self) -> float:
+        return self._error_rate
+
+    def _observe(self, latency: float = None, error: bool = False):
+        if latency is not None:
+            self._latency = latency if self._latency is None else (
+                self._smoothing * latency +
+                (1 - self._smoothing) * self._latency)
+        self._error_rate = self._smoothing * float(error) + (
+            1 - self._smoothing) * self._error_rate
+        self._since_decrease += 1
+
+    def _healthy(self) -> bool:
+        if self._error_rate > self._error_threshold:
+            return False
+        if self._latency_target and self._latency and self._latency > self._latency_target:
+            return False
+        return True
+
+    def _cut(self):
+        if self._since_decrease < self._limit:
+            return
+        previous = self.limit
+        self._limit = max(float(self._minimum), self._limit * self._decrease)
+        self._since_decrease = 0
+        logger.debug(
+            f"Concurrency for {self._name} decreased from {previous} to {self.limit}"
+        )
+
+    def record_success(self, latency: float):
+        """
+        Record a successful request.
+        @param latency: Duration of the request in seconds.
+        """
+        with self._lock:
+            self._observe(latency=latency)
+            if self._healthy():
+                self._limit = min(float(self._maximum),
+                                  self._limit + self._increase / self._limit)
+
+    def record_failure(self, error: Exception = None, latency: float = None):
+        """
+        Record a failed request. Only timeouts and overload responses reduce the limit.
+        @param error: The raised exception.
+        @param latency: Duration of the request in seconds.
+        """
+        with self._lock:
+            self._observe(latency=latency, error=True)
+            if error is None or is_overload_error(error):
+                self._cut()
+
+    def record_wave(self, latency: float, failures: int, total: int):
+        """
+        Record the outcome of a wave of requests run with the current limit, e.g. in a process pool.
+        @param latency: Mean duration per request in seconds.
+        @param failures: Number of failed requests in the wave.
+        @param total: Number of requests in the wave.
+        """
+        if total <= 0:
+            return
+        with self._lock:
+            self._latency = latency
+            self._error_rate = failures / total
+            self._since_decrease = max(self._since_decrease, self.limit)
+            if self._error_rate > self._error_threshold:
+                self._cut()
+            elif self._healthy():
+                self._limit = min(float(self._maximum),
+                                  self._limit + self._increase)
+
+
+class AsyncAdaptiveLimiter(object):
+    """
+    Asynchronous context manager admitting as many concurrent holders as the controller allows.
+    """
+
+    def __init__(self, controller: AIMDController):
+        self._controller = controller
+        self._in_flight = 0
+        self._condition = asyncio.Condition()
+
+    async def __aenter__(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._in_flight < self.
+                                           _controller.limit)
+            self._in_flight += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        async with self._condition:
+            self._in_flight -= 1
+            self._condition.notify_all()
+
+
+def run_in_waves(controller: AIMDController,
+                 tasks: [],
+                 run_wave,
+                 is_failure=lambda result: not result,
+                 rounds: int = 4,
+                 breaker=None,
+                 is_retryable=None,
+                 retries: int = 0,
+                 delay=None) -> []:
+    """
+    Run tasks in consecutive waves whose parallelism follows the controller.
+    Every wave holds `rounds` tasks per allowed worker so the pool start up is amortized.
+    @param controller: The controller of the backend the tasks are sent to.
+    @param tasks: The tasks to run.
+    @param run_wave: Function running a list of tasks with the given parallelism and returning their results.
+    @param is_failure: Function marking a result as failed.
+    @param rounds: Number of tasks per worker in a wave.
+    @param breaker: Optional circuit breaker of the backend. Tasks running in other processes only update
+    their own copy of the breaker, so the outcome of every task is recorded here. Tasks pickled for the next
+    wave carry the updated state, so an open circuit pauses the workers as well. Failures of a wave sent while
+    the circuit was open are mostly rejected requests and don't extend the pause.
+    @param is_retryable: Optional function marking a failed result worth running again in a later wave.
+    @param retries: Number of times a task is run again.
+    @param delay: Function returning the seconds to wait before a wave with tasks on their nth retry.
+    @return: The results of all tasks in order.
+    """
+    results = [None] * len(tasks)
+    queue = [(index, 0) for index in range(len(tasks))]
+    while len(queue):
+        limit = controller.limit
+        wave, queue = queue[:limit * rounds], queue[limit * rounds:]
+        attempt = max(attempt for _, attempt in wave)
+        if attempt and delay is not None:
+            time.sleep(delay(attempt - 1))
+        paused = breaker is not None and breaker.pause() > 0
+        begin = time.monotonic()
+        wave_results = run_wave([tasks[index] for index, _ in wave], limit)
+        elapsed = time.monotonic() - begin
+        failures = 0
+        for (index, attempt), result in zip(wave, wave_results):
+            failed = is_failure(result)
+            failures += failed
+            if breaker is not None:
+                if not failed:
+                    breaker.record_success()
+                elif not paused:
+                    breaker.record_failure()
+            results[index] = result
+            if is_retryable is not None and attempt < retries and is_retryable(
+                    result):
+                queue.append((index, attempt + 1))
+        controller.record_wave(latency=elapsed / math.ceil(len(wave) / limit),
+                               failures=failures,
+                               total=len(wave))
+    return results
+
+
+def create_controllers(settings: dict = None,
+                       default_initial: int = 4) -> dict:
+    """
+    Create one controller per backend.
+    @param settings: Keyword arguments for AIMDController per backend name.
+    @param default_initial: Initial limit of backends without settings.
+    @return: Controllers by backend name.
+    """
+    settings = settings if settings else {}
+    controllers = {}
+    for backend in set(BACKENDS + list(settings.keys())):
+        backend_settings = {
+            "initial": default_initial,
+            "maximum": max(default_initial, 16)
+        }
+        backend_settings.update(settings.get(backend, {}))
+        controllers[backend] = AIMDController(name=backend, **backend_settings)
+    return controllers
@@ -0,0 +1,68 @@
+import atexit
+import logging
+import os
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Engines per process and url. Forked workers create their own engine instead of sharing the sockets of the parent.
+_engines = {}
+
+
+def _prepare_statements(engine: Engine, statements):
+    """
+    Prepare the statements on every new connection of the engine.
+    Prepared statements live as long as their connection, so the pool keeps them across queries.
+    """
+
+    @event.listens_for(engine, "connect")
+    def prepare(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            prepared = statements(cursor) if callable(
+                statements) else statements
+            for name, statement in prepared.items():
+                cursor.execute(f"PREPARE {name} AS {statement}")
+            dbapi_connection.commit()
+        finally:
+            cursor.close()
+
+
+def get_engine(url: str,
+               pool_size: int = 10,
+               max_overflow: int = 10,
+               prepared_statements: {} = None) -> Engine:
+    """
+    Return the pooled engine of the current process for the database url.
+    The connections are checked with a ping before they are handed out, so stale connections are replaced.
+    @param url: SQLAlchemy database url.
+    @param pool_size: Number of connections kept open.
+    @param max_overflow: Number of additional connections opened under load.
+    @param prepared_statements: Statements by name prepared on every connection when the engine is created,
+    or a function returning them for the DBAPI cursor of the new connection.
+    """
+    key = (os.getpid(), url)
+    engine = _engines.get(key)
+    if engine is None:
+        engine = create_engine(url,
+                               pool_size=pool_size,
+                               max_overflow=max_overflow,
+                               pool_pre_ping=True)
+        if prepared_statements:
+            _prepare_statements(engine, prepared_statements)
+        _engines[key] = engine
+    return engine
+
+
+def dispose_engines():
+    """
+    Close the pooled connections of all engines created by the current process.
+    """
+    pid = os.getpid()
+    for key in [key for key in _engines.keys() if key[0] == pid]:
+        _engines.pop(key).dispose()
+
+
+atexit.register(dispose_engines)
@@ -0,0 +1,27 @@
+import logging
+
+from shapely import wkb, wkt
+
+logger = logging.getLogger(__name__)
+
+
+def load_geometry(geometry):
+    """
+    @param geometry: Shapely geometry, WKB bytes or WKT string.
+    @return: The shapely geometry.
+    """
+    if isinstance(geometry, (bytes, bytearray, memoryview)):
+        return wkb.loads(bytes(geometry))
+    if isinstance(geometry, str):
+        return wkt.loads(geometry)
+    return geometry
+
+
+def geometry_wkb(geometry) -> bytes:
+    """
+    @param geometry: Shapely geometry, WKB bytes or WKT string.
+    @return: The geometry as WKB, which is smaller than WKT and parsed without text conversion by PostGIS.
+    """
+    if isinstance(geometry, (bytes, bytearray, memoryview)):
+        return bytes(geometry)
+    return load_geometry(geometry).wkb
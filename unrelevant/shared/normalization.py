@@ -0,0 +1,100 @@
+import logging
+import warnings
+
+import numpy
+import pandas
+from geopandas import GeoDataFrame
+from shapely.geometry import MultiPolygon, Polygon, shape
+
+from unrelevant.exceptions.ProviderExceptions import MalformedShapeError
+
+logger = logging.getLogger(__name__)
+
+
+def parse_lat_lon_shape(lat_lon_shape: []) -> numpy.ndarray:
+    """
+    Parse a list of "lat,lon" strings, as returned by Here, in a single bulk operation.
+    @param lat_lon_shape: List of "lat,lon" strings.
+    @return: C-contiguous array of shape (n, 2) with lon/lat coordinates.
+    Raises a MalformedShapeError naming the first string that isn't a "lat,lon" pair of numbers.
+    """
+    # Every string has to hold exactly one pair, pairs split across strings would parse to the wrong points
+    malformed = next(
+        (point for point in lat_lon_shape if point.count(",") != 1), None)
+    if malformed is not None:
+        raise MalformedShapeError(malformed)
+    with warnings.catch_warnings():
+        # Older numpy versions only warn about unparsable values and return the values read so far
+        warnings.simplefilter("ignore", DeprecationWarning)
+        try:
+            values = numpy.fromstring(",".join(lat_lon_shape),
+                                      dtype=numpy.float64,
+                                      sep=",")
+        except ValueError:
+            values = None
+    if values is None or values.size != 2 * len(lat_lon_shape):
+        raise MalformedShapeError(
+            next((point for point in lat_lon_shape if not _is_lat_lon(point)),
+                 lat_lon_shape))
+    # Contiguous, so orjson serializes it natively when the response is cached
+    return numpy.ascontiguousarray(values.reshape(-1, 2)[:, ::-1])
+
+
+def _is_lat_lon(point: str) -> bool:
+    try:
+        [float(value) for value in point.split(",")]
+    except ValueError:
+        return False
+    return True
+
+
+def ring_to_array(ring: []) -> numpy.ndarray:
+    """
+    @param ring: GeoJSON linear ring.
+    @return: Array of shape (n, 2) with lon/lat coordinates. Additional dimensions are dropped.
+    """
+    return numpy.asarray(ring, dtype=numpy.float64)[:, :2]
+
+
+def _rings_to_polygon(rings: []) -> Polygon:
+    return Polygon(ring_to_array(rings[0]),
+                   [ring_to_array(ring) for ring in rings[1:]])
+
+
+def geometry_to_shapely(geometry: dict):
+    """
+    Build a shapely geometry from a GeoJSON geometry. Polygon coordinates are handed over as arrays.
+    """
+    if geometry['type'] == 'Polygon':
+        return _rings_to_polygon(geometry['coordinates'])
+    if geometry['type'] == 'MultiPolygon':
+        return MultiPolygon([
+            _rings_to_polygon(polygon) for polygon in geometry['coordinates']
+        ])
+    return shape(geometry)
+
+
+def feature_collections_to_frame(feature_collections: [],
+                                 extra_properties: [] = None,
+                                 crs: str = None) -> GeoDataFrame:
+    """
+    Assemble the features of several FeatureCollections into a single GeoDataFrame.
+    The geometries and property columns are collected first and the frame is built once,
+    instead of building and appending one frame per collection.
+    @param feature_collections: List of GeoJSON FeatureCollections.
+    @param extra_properties: Optional properties per collection added to each of its features.
+    @param crs: Optional crs of the frame.
+    @return: GeoDataFrame with one row per feature.
+    """
+    geometries = []
+    records = []
+    for index, feature_collection in enumerate(feature_collections):
+        extra = extra_properties[index] if extra_properties else {}
+        for feature in feature_collection.get('features', []):
+            geometries.append(geometry_to_shapely(feature['geometry']))
+            properties = dict(feature.get('properties') or {})
+            properties.update(extra)
+            records.append(properties)
+    return GeoDataFrame(pandas.DataFrame.from_records(records),
+                        geometry=geometries,
+                        crs=crs)
@@ -0,0 +1,74 @@
+import logging
+
+from unrelevant.shared.streaming import empty_like
+
+logger = logging.getLogger(__name__)
+
+
+def build_filter(tags: dict) -> str:
+    """
+    Build the ohsome filter of a single category.
+    @param tags: Tag values by key, e.g. {"leisure": "park"}.
+    @return: The OR combined tags, e.g. leisure=park or landuse=grass.
+    """
+    return " or ".join([f"{key}={value}" for key, value in tags.items()])
+
+
+def combine_filters(filters: []) -> str:
+    """
+    Combine several ohsome filters into one OR combined filter.
+    """
+    return " or ".join([f"({query_filter})" for query_filter in filters])
+
+
+def matches_tags(properties: dict, tags: dict) -> bool:
+    """
+    Check if the tag properties of an ohsome feature match any tag of a category.
+    """
+    return any(
+        str(properties.get(key)) == str(value) for key, value in tags.items())
+
+
+def deduplicate_features(features: []) -> []:
+    """
+    Drop repeated OSM elements, e.g. an element intersecting several tiles. The first occurrence is kept.
+    Features without an @osmId are kept as they are.
+    """
+    seen = set()
+    unique_features = empty_like(features)
+    for feature in features:
+        osm_id = (feature.get('properties') or {}).get('@osmId')
+        if osm_id is not None:
+            if osm_id in seen:
+                continue
+            seen.add(osm_id)
+        unique_features.append(feature)
+    return unique_features
+
+
+def split_by_category(feature_collection: dict, categories: dict,
+                      filters: dict) -> dict:
+    """
+    Route the features of a combined query to their categories by their tag properties.
+    A feature matching the tags of several categories is added to each of them.
+    @param feature_collection: Response of a combined ohsome query with properties=tags.
+    @param categories: Tags by category name.
+    @param filters: Filter query by category name.
+    @return: One FeatureCollection with its filterQuery per category with at least one feature.
+    """
+    source = feature_collection.get('features', [])
+    features = {category: empty_like(source) for category in filters.keys()}
+    for feature in source:
+        properties = feature.get('properties') or {}
+        for category in features.keys():
+            if matches_tags(properties, categories[category]):
+                features[category].append(feature)
+    return {
+        category: {
+            'type': 'FeatureCollection',
+            'features': category_features,
+            'filterQuery': filters[category]
+        }
+        for category, category_features in features.items()
+        if len(category_features)
+    }
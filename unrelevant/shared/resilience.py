@@ -0,0 +1,225 @@
+import asyncio
+import logging
+import random
+import time
+
+from unrelevant.exceptions.BaseExceptions import CircuitOpenError
+from unrelevant.shared.concurrency import error_status, is_overload_error
+
+logger = logging.getLogger(__name__)
+
+
+def is_retryable_error(error: Exception) -> bool:
+    """
+    Check if a failed request is worth retrying.
+    Timeouts, overload responses and connection errors are transient. Other http 4xx responses,
+    e.g. an unroutable location or a rejected api key, fail again on every attempt.
+    @param error: The raised exception.
+    """
+    if isinstance(error, CircuitOpenError):
+        return False
+    if is_overload_error(error):
+        return True
+    # Checked before the connection errors, since requests' HTTPError is an OSError as well
+    status = error_status(error)
+    if status is not None and 400 <= status < 500:
+        return False
+    return True
+
+
+class TaskFailure(object):
+    """
+    Picklable result of a pool task whose request failed, returned instead of raising the error.
+    Raised errors abort the whole pool map in the parent and many client errors can't be pickled.
+    It is falsy like the empty results of failed tasks.
+    """
+
+    def __init__(self, error: Exception):
+        self.message = f"{type(error).__name__}: {error}"
+        self.overload = is_overload_error(error)
+        self.retryable = is_retryable_error(error)
+
+    def __bool__(self):
+        return False
+
+    def __repr__(self):
+        return f"TaskFailure({self.message})"
+
+
+def is_overload_failure(result) -> bool:
+    """
+    Check if a task result is a failure caused by an overloaded backend.
+    """
+    return isinstance(result, TaskFailure) and result.overload
+
+
+def is_retryable_failure(result) -> bool:
+    """
+    Check if a task result is a transient failure worth running again.
+    """
+    return isinstance(result, TaskFailure) and result.retryable
+
+
+class CircuitBreaker(object):
+    """
+    Pause requests to a backend after a run of consecutive failures.
+
+    Once `failure_threshold` requests failed in a row the circuit opens and callers wait for `reset_timeout`
+    seconds before a trial request is let through. A success closes the circuit again.
+    """
+
+    def __init__(self,
+                 name: str,
+                 failure_threshold: int = 10,
+                 reset_timeout: float = 30):
+        self._name = name
+        self._failure_threshold = max(1, int(failure_threshold))
+        self._reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def pause(self) -> float:
+        """
+        @return: Seconds to wait before the next request may be sent.
+        """
+        if self._opened_at is None:
+            return 0
+        return max(0.0,
+                   self._opened_at + self._reset_timeout - time.monotonic())
+
+    def record_success(self):
+        if self._opened_at is not None:
+            logger.info(f"Circuit breaker for {self._name} closed.")
+        self._failures = 0
+        self._opened_at = None
+
+    def record_failure(self):
+        self._failures += 1
+        if self._failures >= self._failure_threshold:
+            if self._opened_at is None:
+                logger.warning(
+                    f"Circuit breaker for {self._name} opened after {self._failures} consecutive failures. "
+                    f"Pausing requests for {self._reset_timeout} seconds.")
+            self._opened_at = time.monotonic()
+
+
+class RetryPolicy(object):
+    """
+    Retry transient failures with exponential backoff and full jitter within a deadline per request.
+    """
+
+    def __init__(self,
+                 retries: int = 3,
+                 backoff: float = 1.0,
+                 backoff_max: float = 60.0,
+                 jitter: bool = True,
+                 deadline: float = None):
+        self._retries = max(0, int(retries))
+        self._backoff = backoff
+        self._backoff_max = backoff_max
+        self._jitter = jitter
+        self._deadline = deadline
+
+    @property
+    def retries(self) -> int:
+        return self._retries
+
+    @property
+    def deadline(self):
+        return self._deadline
+
+    def delay(self, attempt: int) -> float:
+        """
+        @param attempt: Number of the failed attempt starting at 0.
+        @return: Seconds to wait before the next attempt.
+        """
+        delay = min(self._backoff_max, self._backoff * 2**attempt)
+        if self._jitter:
+            delay = random.uniform(0, delay)
+        return delay
+
+    def _remaining(self, start: float):
+        if self._deadline is None:
+            return None
+        return self._deadline - (time.monotonic() - start)
+
+    def _wait_time(self, start: float, wait: float, error: Exception) -> float:
+        remaining = self._remaining(start)
+        if remaining is not None and wait >= remaining:
+            raise error
+        return wait
+
+    def _before_attempt(self, start: float, breaker: CircuitBreaker) -> float:
+        if not breaker:
+            return 0
+        return self._wait_time(start, breaker.pause(),
+                               CircuitOpenError(breaker.name))
+
+    def _after_failure(self, start: float, attempt: int, error: Exception,
+                       breaker: CircuitBreaker) -> float:
+        if breaker:
+            breaker.record_failure()
+        if attempt >= self._retries or not is_retryable_error(error):
+            raise error
+        return self._wait_time(start, self.delay(attempt), error)
+
+    def call(self, func, *args, breaker: CircuitBreaker = None, **kwargs):
+        """
+        Call the function and retry it on transient errors.
+        @param func: The function to call.
+        @param breaker: Optional circuit breaker of the called backend.
+        @return: The result of the first successful call. The last error is raised if all attempts failed.
+        """
+        start = time.monotonic()
+        attempt = 0
+        while True:
+            time.sleep(self._before_attempt(start, breaker))
+            try:
+                result = func(*args, **kwargs)
+            except Exception as err:
+                wait = self._after_failure(start, attempt, err, breaker)
+                logger.debug(
+                    f"Attempt {attempt + 1} failed. Retrying in {wait:.1f} seconds. Error: {err}"
+                )
+                time.sleep(wait)
+                attempt += 1
+                continue
+            if breaker:
+                breaker.record_success()
+            return result
+
+    async def acall(self,
+                    func,
+                    *args,
+                    breaker: CircuitBreaker = None,
+                    **kwargs):
+        """
+        Asynchronous counterpart of call. Every attempt is cancelled once the deadline is reached.
+        @param func: The coroutine function to call.
+        """
+        start = time.monotonic()
+        attempt = 0
+        while True:
+            await asyncio.sleep(self._before_attempt(start, breaker))
+            try:
+                result = await asyncio.wait_for(func(*args, **kwargs),
+                                                timeout=self._remaining(start))
+            except Exception as err:
+                wait = self._after_failure(start, attempt, err, breaker)
+                logger.debug(
+                    f"Attempt {attempt + 1} failed. Retrying in {wait:.1f} seconds. Error: {err}"
+                )
+                await asyncio.sleep(wait)
+                attempt += 1
+                continue
+            if breaker:
+                breaker.record_success()
+            return result
@@ -0,0 +1,38 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def nested_rings(geometries: []) -> []:
+    """
+    Split nested geometries, e.g. the isochrones of increasing ranges, into disjoint rings.
+    Every ring is the geometry minus all smaller geometries, so the rings up to a range
+    cover the union of the geometries up to that range.
+    @param geometries: Shapely geometries ordered from the smallest range to the largest.
+    @return: One ring per geometry in the same order.
+    """
+    rings = []
+    covered = None
+    for geometry in geometries:
+        if covered is None:
+            rings.append(geometry)
+            covered = geometry
+        else:
+            rings.append(geometry.difference(covered))
+            covered = covered.union(geometry)
+    return rings
+
+
+def prefix_sums(values: []) -> []:
+    """
+    Cumulative sums of the ring values. Once a value is None, all following sums are None.
+    """
+    sums = []
+    total = 0.0
+    for value in values:
+        if value is None or total is None:
+            total = None
+        else:
+            total += value
+        sums.append(total)
+    return sums
@@ -0,0 +1,156 @@
+import codecs
+import json
+import logging
+from array import array
+from collections.abc import Sequence
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = " \t\n\r,"
+
+
+def iter_features(chunks):
+    """
+    Parse the features of a GeoJSON FeatureCollection incrementally from a stream of chunks.
+    Only the feature currently parsed and the unparsed rest of the last chunk are held in memory.
+    @param chunks: Iterable of bytes or str chunks, e.g. requests.Response.iter_content().
+    @return: Generator of the feature dicts in the order of the collection.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    in_features = False
+    finished = False
+    for chunk in chunks:
+        if finished:
+            break
+        if isinstance(chunk, bytes):
+            chunk = text_decoder.decode(chunk)
+        buffer += chunk
+        position = 0
+        if not in_features:
+            start = buffer.find('"features"')
+            bracket = buffer.find("[", start) if start >= 0 else -1
+            if bracket < 0:
+                continue
+            position = bracket + 1
+            in_features = True
+        while True:
+            while position < len(buffer) and buffer[position] in _WHITESPACE:
+                position += 1
+            if position >= len(buffer):
+                break
+            if buffer[position] == "]":
+                finished = True
+                break
+            try:
+                feature, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # The feature continues in the next chunk
+                break
+            yield feature
+            position = end
+        buffer = buffer[position:]
+    if not finished:
+        raise ValueError(
+            "Incomplete FeatureCollection. The stream ended before the end of the features."
+        )
+
+
+class PoiArrays(Sequence):
+    """
+    Compact column store of point features.
+
+    Coordinates are kept in a double array and the OSM ids in a list. The remaining properties,
+    i.e. the tags, are interned per distinct combination and referenced by an integer code per POI.
+    Indexing returns the feature as a GeoJSON dict, so the store can replace a list of point features.
+    """
+
+    def __init__(self, features=None):
+        self._coordinates = array("d")
+        self._osm_ids = []
+        self._tag_codes = array("i")
+        self._tags = []
+        self._tag_index = {}
+        if features is not None:
+            self.extend(features)
+
+    def _tag_code(self, tags: dict) -> int:
+        key = tuple(tags.items())
+        code = self._tag_index.get(key)
+        if code is None:
+            code = len(self._tags)
+            self._tags.append(tags)
+            self._tag_index[key] = code
+        return code
+
+    def append(self, feature: dict):
+        coordinates = feature['geometry']['coordinates']
+        properties = dict(feature.get('properties') or {})
+        self._coordinates.append(float(coordinates[0]))
+        self._coordinates.append(float(coordinates[1]))
+        self._osm_ids.append(properties.pop('@osmId', None))
+        self._tag_codes.append(self._tag_code(properties))
+
+    def extend(self, features):
+        for feature in features:
+            self.append(feature)
+
+    def __len__(self):
+        return len(self._osm_ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("POI index out of range")
+        properties = dict(self._tags[self._tag_codes[index]])
+        if self._osm_ids[index] is not None:
+            properties['@osmId'] = self._osm_ids[index]
+        return {
+            'type': 'Feature',
+            'properties': properties,
+            'geometry': {
+                'type':
+                'Point',
+                'coordinates': [
+                    self._coordinates[2 * index],
+                    self._coordinates[2 * index + 1]
+                ]
+            }
+        }
+
+    @property
+    def coordinates(self) -> array:
+        """
+        Flat lon/lat array of all POIs.
+        """
+        return self._coordinates
+
+    @property
+    def osm_ids(self) -> []:
+        return self._osm_ids
+
+    @property
+    def tag_codes(self) -> array:
+        return self._tag_codes
+
+    @property
+    def tags(self) -> []:
+        """
+        The distinct tag combinations referenced by tag_codes.
+        """
+        return self._tags
+
+    @property
+    def __geo_interface__(self) -> dict:
+        return {'type': 'FeatureCollection', 'features': list(self)}
+
+
+def empty_like(features):
+    """
+    @return: An empty PoiArrays for PoiArrays, an empty list otherwise.
+    """
+    return PoiArrays() if isinstance(features, PoiArrays) else []
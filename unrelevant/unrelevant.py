@@ -10,13 +10,24 @@ import pkg_resources
 
 __version__ = pkg_resources.get_distribution("unrelevant").version
 
+from sqlalchemy import create_engine
+
+from unrelevant.UnrelevantBase.Population.CachedPopulationFetcher import CachedPopulationFetcher
+from unrelevant.UnrelevantBase.Population.PopulationTiles import prepare_population_tiles
+from unrelevant.UnrelevantBase.Provider.CachedProvider import CachedProvider
 from unrelevant.UnrelevantBase.Provider.HereProvider import HereProvider
 from unrelevant.UnrelevantBase.Provider.OpenRouteServiceProvider import OpenRouteServiceProvider
+from unrelevant.UnrelevantBase.Provider.SyntheticProvider import SyntheticProvider
 from unrelevant.UnrelevantBase.Provider.ValhallaProvider import ValhallaProvider
 from unrelevant.UnrelevantBase.scenarios.RecreationScenario import RecreationScenario, PopulationFetcher
 from unrelevant.UnrelevantBase.scenarios.BaseScenario import BaseScenario
-from unrelevant.exceptions.BaseExceptions import ProviderNotImplementedError, ScenarioNotImplementedError
+from unrelevant.exceptions.BaseExceptions import PopulationBackendNotImplementedError, ProviderNotImplementedError, \
+    ScenarioNotImplementedError
 from unrelevant.exceptions.ConfigExceptions import ConfigFileNotFoundError
+from unrelevant.shared import codec
+from unrelevant.shared.cache import OhsomeResponseCache
+from unrelevant.shared.concurrency import create_controllers
+from unrelevant.shared.resilience import CircuitBreaker, RetryPolicy
 from unrelevant.shared.utilities import dependency_check
 
 script_path = os.path.dirname(os.path.realpath(__file__))
@@ -32,6 +43,11 @@ parser.add_argument(
     '--config-file',
     help='Provide a config file to skip the cli configuration.',
     type=str)
+
+parser.add_argument(
+    '--prepare-population-tiles',
+    help='Materialize the population tables of the configured cities and exit.',
+    action='store_true')
 args = parser.parse_args()
 
 if args.config_file:
@@ -60,8 +76,28 @@ def main():
         "Ranges", fallback="[600, 1200, 1800, 3600]"))
     tags = json.loads(config["DEFAULT"].get("Tags"))
     threads = int(config["DEFAULT"].get("Threads", fallback="2"))
+    asynchronous = config["DEFAULT"].getboolean("Async_Isochrones",
+                                                fallback=False)
+    concurrency = int(config["DEFAULT"].get("Async_Concurrency",
+                                            fallback="100"))
     range_type = config["DEFAULT"].get("Range_Type", fallback="time")
+    cluster_radius = float(config["DEFAULT"].get("Cluster_Radius",
+                                                 fallback="0"))
+    combined_poi_query = config["DEFAULT"].getboolean("Combined_POI_Query",
+                                                      fallback=False)
+    poi_batch_cities = int(config["DEFAULT"].get("POI_Batch_Cities",
+                                                 fallback="1"))
+    poi_tile_area = float(config["DEFAULT"].get("POI_Tile_Area_KM2",
+                                                fallback="0"))
+    stream_pois = config["DEFAULT"].getboolean("Stream_POIs", fallback=False)
+    boundary_tolerance = float(config["DEFAULT"].get("Boundary_Tolerance",
+                                                     fallback="0"))
+    boundary_precision = int(config["DEFAULT"].get("Boundary_Precision",
+                                                   fallback="6"))
+    annulus_population = config["DEFAULT"].getboolean("Annulus_Population",
+                                                      fallback=False)
     verbosity = config["DEFAULT"].get("Verbosity", fallback="info")
+    json_backend = config["DEFAULT"].get("Json_Backend")
     output_folder = config["DEFAULT"].get("Output_Folder")
 
     # Get database settings
@@ -70,6 +106,10 @@ def main():
     user = config['postgres'].get("User")
     password = config['postgres'].get("Password")
     database = config['postgres'].get("Database")
+    pool_size = int(config['postgres'].get("Pool_Size", fallback="10"))
+    max_overflow = int(config['postgres'].get("Max_Overflow", fallback="10"))
+    population_batch_size = int(config['postgres'].get("Batch_Size",
+                                                       fallback="50"))
 
     # Logger settings
     formatter = logging.Formatter(fmt=log_format)
@@ -80,17 +120,53 @@ def main():
                                           fallback="info").upper())
     logger.addHandler(handler)
 
+    if json_backend:
+        codec.set_backend(json_backend)
+
+    if args.prepare_population_tiles:
+        prepare_tiles(
+            database_url=
+            f'postgresql://{user}:{password}@{database_url}:{port}/{database}',
+            cities=cities)
+        return
+
+    # Concurrency settings
+    concurrency_settings = {}
+    if config.has_section("concurrency"):
+        concurrency_settings = {
+            backend: json.loads(config["concurrency"].get(backend))
+            for backend in config.options("concurrency")
+            if not config.has_option("DEFAULT", backend)
+        }
+    controllers = create_controllers(concurrency_settings,
+                                     default_initial=threads)
+
+    # Retry settings
+    retry_policy = RetryPolicy(
+        retries=int(config["DEFAULT"].get("Retries", fallback="3")),
+        backoff=float(config["DEFAULT"].get("Retry_Backoff", fallback="1")),
+        backoff_max=float(config["DEFAULT"].get("Retry_Backoff_Max",
+                                                fallback="60")),
+        deadline=float(config["DEFAULT"].get("Request_Deadline",
+                                             fallback="600")))
+
     # Ohsome settings
     ohsome_api = config["ohsome"].get("URL", fallback="https://api.ohsome.org")
+    ohsome_metadata_path = config["ohsome"].get("Metadata_Cache", fallback="")
+    ohsome_metadata_ttl = float(config["ohsome"].get("Metadata_TTL_Hours",
+                                                     fallback="24")) * 3600
 
     # Get provider settings
     if str(provider).lower() == 'ors':
         api_key = config["openrouteservice"].get("Api_Key")
         base_url = config["openrouteservice"].get("URL")
+        batch_size = int(config["openrouteservice"].get("Batch_Size",
+                                                        fallback="5"))
         provider = OpenRouteServiceProvider(
             api_key=api_key,
             profile=profile,
-            base_url=base_url if len(base_url) > 0 else None)
+            base_url=base_url if len(base_url) > 0 else None,
+            batch_size=batch_size)
     elif str(provider).lower() == 'valhalla':
         range_type = "time"
         api_key = config["Valhalla"].get("Api_Key")
@@ -102,23 +178,82 @@ def main():
     elif str(provider).lower() == 'here':
         api_key = config["Here"].get("Api_Key")
         provider = HereProvider(api_key=api_key, profile=profile)
+    elif str(provider).lower() == 'synthetic':
+        provider = SyntheticProvider(
+            profile=profile,
+            vertices=int(config["synthetic"].get("Vertices", fallback="64")),
+            irregularity=float(config["synthetic"].get("Irregularity",
+                                                       fallback="0.2")),
+            latency=float(config["synthetic"].get("Latency", fallback="0")),
+            error_rate=float(config["synthetic"].get("Error_Rate",
+                                                     fallback="0")),
+            seed=int(config["synthetic"].get("Seed", fallback="0")))
     else:
         raise ProviderNotImplementedError(str(provider))
 
+    # Cache settings
+    ohsome_cache = None
+    if config.has_section("cache"):
+        isochrone_cache = config["cache"].get("Isochrone_Cache", fallback="")
+        if len(isochrone_cache) > 0:
+            cache_size = int(config["cache"].get("Isochrone_Cache_Size_MB",
+                                                 fallback="2048"))
+            precision = int(config["cache"].get("Coordinate_Precision",
+                                                fallback="6"))
+            provider = CachedProvider(provider=provider,
+                                      cache_path=isochrone_cache,
+                                      max_size_bytes=cache_size * 1024**2,
+                                      precision=precision)
+        ohsome_cache_path = config["cache"].get("Ohsome_Cache", fallback="")
+        if len(ohsome_cache_path) > 0:
+            cache_size = int(config["cache"].get("Ohsome_Cache_Size_MB",
+                                                 fallback="1024"))
+            ohsome_cache = OhsomeResponseCache(path=ohsome_cache_path,
+                                               max_size_bytes=cache_size *
+                                               1024**2)
+
+    circuit_breaker = CircuitBreaker(
+        name=provider.provider_name,
+        failure_threshold=int(config["DEFAULT"].get("Circuit_Failures",
+                                                    fallback="10")),
+        reset_timeout=float(config["DEFAULT"].get("Circuit_Pause",
+                                                  fallback="30")))
+
     # Get scenario settings
     if str(scenario).lower() == 'recreation':
-        population_fetcher = PopulationFetcher(url=database_url,
-                                               port=port,
-                                               db=database,
-                                               user=user,
-                                               password=password)
+        population_fetcher = create_population_fetcher(
+            database_url=database_url,
+            port=port,
+            database=database,
+            user=user,
+            password=password,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            batch_size=population_batch_size)
         scenario = RecreationScenario(cities=cities,
                                       tags=tags,
                                       ranges=ranges,
                                       provider=provider,
                                       ohsome_api=ohsome_api,
                                       threads=threads,
-                                      population_fetcher=population_fetcher)
+                                      population_fetcher=population_fetcher,
+                                      asynchronous=asynchronous,
+                                      concurrency=concurrency,
+                                      controllers=controllers,
+                                      retry_policy=retry_policy,
+                                      circuit_breaker=circuit_breaker,
+                                      cluster_radius=cluster_radius,
+                                      ohsome_cache=ohsome_cache,
+                                      combined_poi_query=combined_poi_query,
+                                      poi_batch_cities=poi_batch_cities,
+                                      poi_tile_area=poi_tile_area,
+                                      stream_pois=stream_pois,
+                                      boundary_tolerance=boundary_tolerance,
+                                      boundary_precision=boundary_precision,
+                                      ohsome_metadata_path=ohsome_metadata_path
+                                      if len(ohsome_metadata_path) else None,
+                                      ohsome_metadata_ttl=ohsome_metadata_ttl,
+                                      annulus_population=annulus_population)
     else:
         raise ScenarioNotImplementedError(str(scenario))
 
@@ -131,6 +266,7 @@ def main():
     logger.info(f"# Cities: {cities}")
     logger.info(f"# Ranges: {ranges}")
     logger.info(f"# Range Type: {range_type}")
+    logger.info(f"# Cluster Radius: {cluster_radius}")
     logger.info(f"# Verbosity: {verbosity}")
     logger.info(f"# Output Folder: {os.path.abspath(output_folder)}")
     logger.info("#######Started processing#######")
@@ -143,9 +279,86 @@ def main():
     logger.info(f"# Elapsed time: {finish - start}")
     logger.info(f"# Output Files:")
     [logger.info(f"# {file}") for file in output_files]
+    for controller in controllers.values():
+        logger.info(
+            f"# Final concurrency {controller.name}: {controller.limit}")
+    if isinstance(provider, CachedProvider):
+        logger.info(
+            f"# Isochrone cache: {provider.hits} hits | {provider.misses} misses"
+        )
+    if isinstance(population_fetcher, CachedPopulationFetcher):
+        logger.info(
+            f"# Population cache: {population_fetcher.hits} hits | {population_fetcher.misses} misses"
+        )
     logger.info("#######Finisched processing#######")
 
 
+def create_population_fetcher(database_url, port, database, user, password,
+                              pool_size: int, max_overflow: int,
+                              batch_size: int):
+    backend = "postgis"
+    memoize = True
+    population_cache = ""
+    use_tiles = True
+    if config.has_section("population"):
+        backend = config["population"].get("Backend", fallback="postgis")
+        use_tiles = config["population"].getboolean("Use_Tiles", fallback=True)
+        memoize = config["population"].getboolean("Memoize", fallback=True)
+        population_cache = config["population"].get("Cache", fallback="")
+    if str(backend).lower() == 'postgis':
+        population_fetcher = PopulationFetcher(url=database_url,
+                                               port=port,
+                                               db=database,
+                                               user=user,
+                                               password=password,
+                                               pool_size=pool_size,
+                                               max_overflow=max_overflow,
+                                               batch_size=batch_size,
+                                               use_tiles=use_tiles)
+    elif str(backend).lower() == 'raster':
+        # rasterio is only required for the raster backend
+        from unrelevant.UnrelevantBase.Population.RasterPopulationFetcher import RasterPopulationFetcher
+        population_fetcher = RasterPopulationFetcher(
+            path=config["population"].get("Raster"),
+            batch_size=batch_size,
+            all_touched=config["population"].getboolean("All_Touched",
+                                                        fallback=False))
+    elif str(backend).lower() == 'points':
+        from unrelevant.UnrelevantBase.Population.PointGridPopulationFetcher import PointGridPopulationFetcher
+        population_fetcher = PointGridPopulationFetcher(
+            path=config["population"].get("Raster"),
+            batch_size=batch_size,
+            margin=config["population"].getfloat("Grid_Margin", fallback=0.1))
+    else:
+        raise PopulationBackendNotImplementedError(str(backend))
+    if memoize:
+        population_fetcher = CachedPopulationFetcher(
+            fetcher=population_fetcher,
+            cache_path=population_cache if len(population_cache) > 0 else None)
+    return population_fetcher
+
+
+def prepare_tiles(database_url: str, cities: {}):  # pragma: no cover
+    margin = 0.5
+    tile_size = 50
+    overviews = []
+    if config.has_section("population"):
+        margin = float(config["population"].get("Tile_Margin", fallback="0.5"))
+        tile_size = int(config["population"].get("Tile_Size", fallback="50"))
+        overviews = json.loads(config["population"].get("Tile_Overviews",
+                                                        fallback="[]"))
+    engine = create_engine(database_url)
+    try:
+        tables = prepare_population_tiles(engine,
+                                          cities=cities,
+                                          margin=margin,
+                                          tile_size=tile_size,
+                                          overviews=overviews)
+    finally:
+        engine.dispose()
+    logger.info(f"# Prepared population tables: {tables}")
+
+
 def process(scenario: BaseScenario,
             output_folder: str) -> [str]:  # pragma: no cover
     scenario.process()